@@ -0,0 +1,77 @@
+"""
+컬렉션 존재 확인 벤치마크
+
+요청마다 list_collection_names를 호출하던 기존 방식과 시작 시 캐시한 목록을 쓰는 ensure_collection 비교
+
+실제 mongod 없이 실행되므로 list_collection_names 한 번을 서버 왕복(RTT) 한 번으로 보고 sleep으로 대신함
+
+실행: python benchmarks/ensure_collection.py [RTT(ms) ...]   (기본값: 0 1 5)
+"""
+import os
+import sys
+import asyncio
+import statistics
+import time
+
+from fastapi import HTTPException
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db.database as database
+
+CALLS = 300
+COLLECTION_COUNT = 30
+
+
+class RoundTripDB:
+    """
+    list_collection_names 한 번에 서버 왕복 한 번이 걸리는 DB
+    """
+
+    def __init__(self, names: list[str], rtt: float):
+        self.names = names
+        self.rtt = rtt
+
+    async def list_collection_names(self):
+        await asyncio.sleep(self.rtt)
+        return list(self.names)
+
+
+async def old_check(name: str):
+    # 기존 방식: 요청마다 컬렉션 목록 조회
+    collections = await database.db.list_collection_names()
+    if name not in collections:
+        raise HTTPException(status_code=404, detail="Collection not found")
+
+
+async def measure(check, name: str) -> tuple[float, float]:
+    latencies = []
+    for _ in range(CALLS):
+        start = time.perf_counter()
+        try:
+            await check(name)
+        except HTTPException:
+            pass
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(CALLS * 0.99) - 1]
+
+
+async def main(rtts_ms: list[float]):
+    names = [f"bonre_c{i}" for i in range(COLLECTION_COUNT)] + ["bonre_products"]
+    cases = [
+        ("old, existing", old_check, "bonre_products"),
+        ("cached (hit)", database.ensure_collection, "bonre_products"),
+        ("old, missing", old_check, "bonre_missing"),
+        ("cached (miss)", database.ensure_collection, "bonre_missing"),
+    ]
+    for rtt_ms in rtts_ms:
+        database.db = RoundTripDB(names, rtt_ms / 1000)
+        await database.load_collection_names()
+        for label, check, name in cases:
+            p50, p99 = await measure(check, name)
+            print(f"RTT {rtt_ms:4.1f}ms  {label:14s} p50 {p50:9.1f}us  p99 {p99:9.1f}us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main([float(arg) for arg in sys.argv[1:]] or [0, 1, 5]))
@@ -0,0 +1,121 @@
+"""
+응답 인코딩 벤치마크
+
+기존 응답 경로(sanitize_data -> jsonable_encoder -> JSONResponse)와 BSONJSONResponse(dumps_bson) 비교
+같은 Mongo 문서를 bytes로 만드는 시간을 측정하고, 두 결과가 json.loads 후 같은지 확인
+
+실행: python benchmarks/json_encoding.py
+"""
+import os
+import sys
+import json
+import random
+import timeit
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.json_response import BSONJSONResponse
+
+REPEAT = 5
+
+
+def sanitize_data(data):
+    # 변경 전 db/models.py의 sanitize_data (비교용으로 그대로 복사)
+    sanitized_data = []
+    for item in data:
+        sanitized_item = {}
+        for key, value in item.items():
+            if isinstance(value, ObjectId):
+                sanitized_item[key] = str(value)
+            elif isinstance(value, float):
+                if value == float('inf') or value == float('-inf') or value != value:
+                    sanitized_item[key] = None
+                else:
+                    sanitized_item[key] = value
+            elif isinstance(value, dict):
+                sanitized_item[key] = sanitize_data([value])[0]
+            elif isinstance(value, list):
+                sanitized_item[key] = [
+                    str(v) if isinstance(v, ObjectId)
+                    else sanitize_data([v])[0] if isinstance(v, dict)
+                    else v
+                    for v in value
+                ]
+            else:
+                sanitized_item[key] = value
+        sanitized_data.append(sanitized_item)
+    return sanitized_data
+
+
+def seed_product(history: int) -> dict:
+    """
+    cheapest 가격 이력이 history개인 상품 (97번째마다 가격이 NaN)
+    """
+    return {
+        "_id": ObjectId(),
+        "name": "Flowerpot VP3",
+        "subname": "Table lamp",
+        "name_kr": "플라워팟",
+        "brand": "brand_andtradition",
+        "category": ["lamp"],
+        "designer": ["verner_panton"],
+        "upload": True,
+        "price": 250000.0,
+        "bookmark_counts": 12,
+        "main_image_url": "https://example.blob.core.windows.net/img/a.jpg",
+        "cheapest": [
+            {
+                "date": datetime(2022, 1, 1) + timedelta(days=i),
+                "price": random.random() * 1e5 if i % 97 else float("nan"),
+                "shop_id": "shop_x",
+                "shop_sld": "x",
+            }
+            for i in range(history)
+        ],
+    }
+
+
+def old_response(content) -> bytes:
+    if isinstance(content, list):
+        return JSONResponse(content=jsonable_encoder(sanitize_data(content))).body
+    return JSONResponse(content=jsonable_encoder(sanitize_data([content])[0])).body
+
+
+def new_response(content) -> bytes:
+    return BSONJSONResponse(content).body
+
+
+def best_us(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=REPEAT)) / number * 1e6
+
+
+def main():
+    random.seed(1)
+    home_cards = []
+    for _ in range(100):
+        card = seed_product(0)
+        del card["cheapest"]
+        home_cards.append(card)
+
+    cases = [
+        ("product, 1000 cheapest", seed_product(1000), 200),
+        ("product, 30 cheapest", seed_product(30), 2000),
+        ("home list, 100 cards", home_cards, 2000),
+    ]
+    for label, content, number in cases:
+        assert json.loads(old_response(content)) == json.loads(new_response(content)), label
+        old_us = best_us(lambda: old_response(content), number)
+        new_us = best_us(lambda: new_response(content), number)
+        print(
+            f"{label:24s} sanitize_data+jsonable_encoder+json {old_us:9.1f}us  "
+            f"dumps_bson {new_us:7.1f}us  {old_us / new_us:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+상품 카드 projection 벤치마크
+
+/product/home 한 페이지(20개 상품)를 기준으로 전체 상품 문서와 PRODUCT_CARD_PROJECTION 적용 문서를 비교
+- bytes: Mongo가 앱으로 보내는 BSON 크기
+- latency: 앱 측 처리 시간 (BSON decode + build_home_product_card + dumps_bson)
+
+실제 mongod 없이 실행되므로 서버 측 조회/네트워크 전송 시간은 포함하지 않음 (둘 다 bytes에 비례)
+
+실행: python benchmarks/product_card_projection.py
+"""
+import os
+import sys
+import random
+import timeit
+from datetime import datetime, timedelta
+
+import bson
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.product_card import PRODUCT_CARD_FIELDS, build_home_product_card
+from utils.json_response import dumps_bson
+
+PAGE_SIZE = 20
+HISTORY_LENGTHS = (30, 365, 1000)
+NUMBER = 200
+REPEAT = 5
+
+
+def seed_product(history: int) -> dict:
+    """
+    실제 상품 문서와 같은 구조의 상품 생성 (cheapest 가격 이력 history개)
+    """
+    return {
+        "_id": ObjectId(),
+        "name": "Flowerpot VP3",
+        "subname": "Table lamp",
+        "name_kr": "플라워팟 VP3",
+        "subname_kr": "테이블 램프",
+        "brand": "brand_andtradition",
+        "brand_kr": "앤트레디션",
+        "category": ["lamp"],
+        "designer": ["verner_panton"],
+        "upload": True,
+        "description": "1968년 베르너 팬톤이 디자인한 조명. " * 30,
+        "filter": {"color": ["red", "blue"], "material": ["metal"], "size": "M"},
+        "shop_urls": [
+            {"shop_id": f"shop_{i}", "url": f"https://shop{i}.example.com/products/flowerpot-vp3?variant=123456"}
+            for i in range(6)
+        ],
+        "main_image_url": "https://example.blob.core.windows.net/img/a.jpg",
+        "bookmark_counts": 12,
+        "images": {
+            "original": "https://example.blob.core.windows.net/img/a.jpg",
+            "card": "https://example.blob.core.windows.net/img/a_card.webp",
+            "detail": "https://example.blob.core.windows.net/img/a_detail.webp",
+            "zoom": "https://example.blob.core.windows.net/img/a_zoom.webp",
+            "placeholder": "data:image/webp;base64," + "A" * 120,
+        },
+        "cheapest": [
+            {
+                "date": datetime(2024, 1, 1) + timedelta(days=i),
+                "price": round(random.random() * 1e5),
+                "shop_id": "shop_x",
+                "shop_sld": "x",
+            }
+            for i in range(history)
+        ],
+    }
+
+
+def project(doc: dict) -> dict:
+    """
+    PRODUCT_CARD_PROJECTION을 적용했을 때 Mongo가 보내는 문서 (카드 필드 + cheapest 마지막 항목)
+    """
+    projected = {}
+    for field in PRODUCT_CARD_FIELDS:
+        top, _, sub = field.partition(".")
+        if top not in doc:
+            continue
+        if sub:
+            if sub in doc[top]:
+                projected.setdefault(top, {})[sub] = doc[top][sub]
+        else:
+            projected[top] = doc[top]
+    projected["cheapest"] = doc["cheapest"][-1:]
+    return projected
+
+
+def render_page(raw_docs: list[bytes]) -> bytes:
+    # 앱 측 비용: driver의 BSON decode + 카드 생성 + 응답 인코딩
+    return dumps_bson([build_home_product_card(bson.decode(raw)) for raw in raw_docs])
+
+
+def best_ms(fn) -> float:
+    return min(timeit.repeat(fn, number=NUMBER, repeat=REPEAT)) / NUMBER * 1e3
+
+
+def main():
+    random.seed(1)
+    for history in HISTORY_LENGTHS:
+        page = [seed_product(history) for _ in range(PAGE_SIZE)]
+        full = [bson.encode(doc) for doc in page]
+        card = [bson.encode(project(doc)) for doc in page]
+
+        # 두 경우 모두 같은 HTTP 응답을 만들어야 함
+        body = render_page(card)
+        assert render_page(full) == body
+
+        full_bytes = sum(map(len, full))
+        card_bytes = sum(map(len, card))
+        full_ms = best_ms(lambda: render_page(full))
+        card_ms = best_ms(lambda: render_page(card))
+        print(
+            f"history {history:4d}: "
+            f"bytes/page full {full_bytes / 1024:7.1f}KiB  card {card_bytes / 1024:5.1f}KiB "
+            f"({full_bytes / card_bytes:5.1f}x) | "
+            f"decode+build+encode full {full_ms:6.2f}ms  card {card_ms:5.2f}ms | "
+            f"HTTP body {len(body)}B"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,118 @@
 # database.py
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_preferences import SecondaryPreferred
+from fastapi import HTTPException
 import os
+import asyncio
+import logging
 import certifi
 
+from db.indexes import ensure_indexes
+
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # 환경 변수로부터 MongoDB URI 불러오기
 db_uri = os.getenv("MONGODB_URI")
 
+# 커넥션 풀 설정
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 10))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 300000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+# catalog_db에서 허용하는 secondary 복제 지연 (MongoDB 최소값 90초)
+MONGO_CATALOG_MAX_STALENESS_SECONDS = int(os.getenv("MONGO_CATALOG_MAX_STALENESS_SECONDS", 120))
+
 # MongoDB 클라이언트 설정
-client = AsyncIOMotorClient(db_uri, tlsCAFile=certifi.where())
+# 생성 시에는 연결하지 않고, lifespan에서 connect_db()로 연결/워밍업, close_db()로 종료
+client = AsyncIOMotorClient(
+    db_uri,
+    tlsCAFile=certifi.where(),
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+)
 db = client.bonre
+
+"""
+읽기 선호도별 DB 핸들 (같은 client / 커넥션 풀 공유)
+
+- db: primary. 쓰기, 인증, 북마크 등 방금 쓴 데이터를 바로 읽어야 하는 경우
+- catalog_db: secondaryPreferred. 상품 목록/검색, 브랜드, 가격 그래프처럼 수 초~수십 초 지연이 허용되는 조회
+  (replica set이 아니거나 secondary가 없으면 primary에서 읽음)
+"""
+catalog_db = client.get_database(
+    "bonre",
+    read_preference=SecondaryPreferred(max_staleness=MONGO_CATALOG_MAX_STALENESS_SECONDS),
+)
+
+# 시작 시 DB 초기화(init_db)가 끝났는지 여부 (/readyz)
+db_ready = False
+
+# 서버 시작 시 한 번 조회한 컬렉션 목록 (요청마다 list_collection_names 호출 방지)
+existing_collections: set[str] = set()
+
+
+async def load_collection_names():
+    """
+    DB의 컬렉션 목록을 조회해 캐시에 저장. lifespan 시작 시 호출됨
+    """
+    names = await db.list_collection_names()
+    existing_collections.clear()
+    existing_collections.update(names)
+    return existing_collections
+
+
+async def ensure_collection(name: str):
+    """
+    캐시된 컬렉션 목록으로 존재 여부 확인. 없으면 404
+
+    캐시에 없는 경우에만 목록을 다시 조회하므로, 서버 실행 중에 생성된 컬렉션도 반영됨
+    """
+    if name in existing_collections:
+        return
+    await load_collection_names()
+    if name not in existing_collections:
+        raise HTTPException(status_code=404, detail="Collection not found")
+
+
+async def connect_db():
+    """
+    서버 연결 확인 후 MONGO_MIN_POOL_SIZE개의 연결을 미리 생성
+
+    동시에 ping을 보내 연결(TLS 핸드셰이크 포함)을 만들어두므로 배포 직후 첫 요청들이 연결 비용을 내지 않음
+    """
+    await client.admin.command("ping")
+    await asyncio.gather(*[client.admin.command("ping") for _ in range(MONGO_MIN_POOL_SIZE)])
+
+
+async def ping_db(timeout: float = 2) -> bool:
+    """readiness 확인용 ping"""
+    try:
+        await asyncio.wait_for(client.admin.command("ping"), timeout=timeout)
+        return True
+    except Exception as e:
+        logger.warning(f"MongoDB ping failed: {e}")
+        return False
+
+
+def close_db():
+    """lifespan 종료 시 호출"""
+    global db_ready
+    db_ready = False
+    client.close()
+
+
+async def init_db():
+    """
+    서버 시작 시 DB 초기화 작업 (연결 워밍업, 인덱스 생성, 컬렉션 목록 캐시)
+    """
+    global db_ready
+    await connect_db()
+    await ensure_indexes(db)
+    await load_collection_names()
+    db_ready = True
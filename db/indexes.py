@@ -0,0 +1,240 @@
+# indexes.py
+import asyncio
+import logging
+import sys
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+logger = logging.getLogger(__name__)
+
+"""
+Index 정의
+
+라우터의 주요 조회 쿼리에 맞춰 필요한 인덱스를 선언. 서버 시작 시 ensure_indexes()로 생성
+"""
+
+INDEXES = {
+    # price 라우터 / 크롤링: {product_id, shop_sld} 조회, product_id 단독 조회는 prefix로 처리
+    "bonre_prices": [
+        IndexModel([("product_id", ASCENDING), ("shop_sld", ASCENDING)], name="product_id_shop_sld"),
+    ],
+    # 북마크: 사용자별 중복 북마크 방지 + {email}, {email, product_id} 조회
+    "bonre_bookmarks": [
+        IndexModel([("email", ASCENDING), ("product_id", ASCENDING)], name="email_product_id", unique=True),
+        # 내 북마크 상품: {email} + sort {created_at, _id} 내림차순 (cursor pagination)
+        IndexModel([("email", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="email_created_at_id"),
+    ],
+    "bonre_products": [
+        # 브랜드별 상품 목록: {brand, upload} + sort {name, subname}
+        IndexModel(
+            [("brand", ASCENDING), ("upload", ASCENDING), ("name", ASCENDING), ("subname", ASCENDING)],
+            name="brand_upload_name_subname",
+        ),
+        # 홈 목록: {upload} + sort {brand, name, subname, _id} (keyset pagination)
+        IndexModel(
+            [("upload", ASCENDING), ("brand", ASCENDING), ("name", ASCENDING), ("subname", ASCENDING), ("_id", ASCENDING)],
+            name="upload_brand_name_subname_id",
+        ),
+        # 카테고리 목록: {upload, category} + sort {brand, name, subname, _id}
+        IndexModel(
+            [("upload", ASCENDING), ("category", ASCENDING), ("brand", ASCENDING), ("name", ASCENDING), ("subname", ASCENDING), ("_id", ASCENDING)],
+            name="upload_category_brand_name_subname_id",
+        ),
+        # 중복 검사: {name_kr, subname_kr, upload}
+        IndexModel(
+            [("name_kr", ASCENDING), ("subname_kr", ASCENDING), ("upload", ASCENDING)],
+            name="name_kr_subname_kr_upload",
+        ),
+    ],
+    "bonre_users": [
+        IndexModel([("email", ASCENDING)], name="email", unique=True),
+    ],
+    "email_verifications": [
+        IndexModel([("email", ASCENDING)], name="email"),
+        # 만료된 인증 정보 자동 삭제
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    # 메일 발송 큐: 발송할 메일 조회 + 발송 완료 후 7일 뒤 삭제
+    "email_outbox": [
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt_at"),
+        IndexModel([("sent_at", ASCENDING)], name="sent_at_ttl", expireAfterSeconds=7 * 24 * 60 * 60),
+    ],
+}
+
+
+async def remove_duplicate_bookmarks(database) -> int:
+    """
+    같은 (email, product_id) 북마크 중 가장 먼저 만든 것만 남기고 삭제 (unique 인덱스 생성 전 정리)
+
+    상품의 bookmark_counts는 매일 reconcile_bookmark_counts에서 bonre_bookmarks 기준으로 다시 맞춰짐
+    output : 삭제한 북마크 수
+    """
+    pipeline = [
+        {"$sort": {"created_at": ASCENDING, "_id": ASCENDING}},
+        {"$group": {"_id": {"email": "$email", "product_id": "$product_id"}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+    duplicate_ids = []
+    async for group in database["bonre_bookmarks"].aggregate(pipeline, allowDiskUse=True):
+        duplicate_ids.extend(group["ids"][1:])
+    if not duplicate_ids:
+        return 0
+    result = await database["bonre_bookmarks"].delete_many({"_id": {"$in": duplicate_ids}})
+    logger.warning(f"Removed {result.deleted_count} duplicate bookmarks before creating the unique index")
+    return result.deleted_count
+
+
+async def ensure_indexes(database):
+    """
+    INDEXES에 선언된 인덱스 생성. 이미 존재하면 MongoDB가 무시함
+
+    컬렉션 단위로 실패를 기록하고 계속 진행 (기존 데이터 중복 등으로 unique 생성이 실패해도 서버는 실행)
+    북마크 unique 인덱스가 아직 없으면 먼저 중복 북마크를 정리
+    """
+    try:
+        if "email_product_id" not in await database["bonre_bookmarks"].index_information():
+            await remove_duplicate_bookmarks(database)
+    except Exception as e:
+        logger.error(f"Failed to remove duplicate bookmarks: {e}")
+
+    created = {}
+    for collection_name, models in INDEXES.items():
+        try:
+            created[collection_name] = await database[collection_name].create_indexes(models)
+        except Exception as e:
+            logger.error(f"Failed to create indexes on {collection_name}: {e}")
+    return created
+
+
+"""
+Query plan 검증
+
+라우터의 주요 조회 쿼리를 explain()으로 확인하고 COLLSCAN, 인덱스를 쓰지 않는 정렬(in-memory SORT)이 있으면 실패로 처리
+조회 조건은 라우터가 쓰는 helper(build_home_pipeline, build_cursor_match, build_bookmark_products_pipeline 등)로 만들어
+라우터 쿼리가 바뀌면 검증 대상도 같이 바뀜
+$lookup 안의 조회는 executionStats의 collectionScans로 확인하므로 데이터가 있는 DB에서 실행해야 함
+"""
+
+
+def build_hot_queries() -> list[dict]:
+    """
+    검증할 쿼리 목록 {collection, filter, sort} 또는 {collection, pipeline}
+
+    라우터 모듈이 db.database(-> db.indexes)를 import하므로 함수 안에서 import
+    """
+    from router.bookmark import build_bookmark_products_pipeline, encode_bookmark_cursor
+    from utils.product_card import BRAND_PRODUCTS_SORT, PRODUCT_CARD_PROJECTION
+    from utils.product_search import build_duplicate_check_query, build_home_pipeline, encode_cursor
+
+    # 빈 문자열은 조건에서 빠지는 인자(category_id, product_sub_name)가 있으므로 값이 있는 예시 사용
+    product_cursor = encode_cursor({"brand": "", "name": "", "subname": "", "_id": ObjectId()})
+    bookmark_cursor = encode_bookmark_cursor({"created_at": datetime.utcnow(), "_id": ObjectId()})
+
+    return [
+        # price 라우터 / 크롤링
+        {"collection": "bonre_prices", "filter": {"product_id": "", "shop_sld": ""}},
+        {"collection": "bonre_prices", "filter": {"product_id": ""}},
+        # 북마크 생성(upsert), 북마크 여부(get_bookmarked_product_ids), 내 북마크
+        {"collection": "bonre_bookmarks", "filter": {"email": "", "product_id": ""}},
+        {"collection": "bonre_bookmarks", "filter": {"email": "", "product_id": {"$in": [""]}}},
+        {"collection": "bonre_bookmarks", "filter": {"email": ""}},
+        # 내 북마크 상품: 첫 페이지, cursor 이후 페이지 ($lookup 포함)
+        {"collection": "bonre_bookmarks", "pipeline": build_bookmark_products_pipeline("", 20)},
+        {"collection": "bonre_bookmarks", "pipeline": build_bookmark_products_pipeline("", 20, bookmark_cursor)},
+        # 홈 목록: 전체/카테고리 x 첫 페이지/cursor 이후 페이지
+        {"collection": "bonre_products", "pipeline": build_home_pipeline()},
+        {"collection": "bonre_products", "pipeline": build_home_pipeline(cursor=product_cursor)},
+        {"collection": "bonre_products", "pipeline": build_home_pipeline(category_id="sample")},
+        {"collection": "bonre_products", "pipeline": build_home_pipeline(category_id="sample", cursor=product_cursor)},
+        # 브랜드별 상품 목록
+        {"collection": "bonre_products", "filter": {"brand": "", "upload": True}, "projection": PRODUCT_CARD_PROJECTION, "sort": BRAND_PRODUCTS_SORT},
+        # 중복 검사: 서브네임 있음/없음
+        {"collection": "bonre_products", "filter": build_duplicate_check_query("sample", "sample")},
+        {"collection": "bonre_products", "filter": build_duplicate_check_query("sample")},
+        {"collection": "bonre_users", "filter": {"email": ""}},
+        {"collection": "email_verifications", "filter": {"email": ""}},
+    ]
+
+
+def _plan_stages(plan):
+    """winningPlan 트리의 모든 stage 이름 반환"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(_plan_stages(value))
+    return stages
+
+
+def _find_values(explain, key: str) -> list:
+    """explain 결과에서 key의 값을 모두 찾음 (aggregate는 winningPlan이 stages 안에 있음)"""
+    values = []
+    if isinstance(explain, dict):
+        for name, value in explain.items():
+            if name == key:
+                values.append(value)
+            else:
+                values.extend(_find_values(value, key))
+    elif isinstance(explain, list):
+        for value in explain:
+            values.extend(_find_values(value, key))
+    return values
+
+
+def _plan_problems(explain: dict, sorted_query: bool) -> list[str]:
+    problems = []
+    stages = [stage for plan in _find_values(explain, "winningPlan") for stage in _plan_stages(plan)]
+    if "COLLSCAN" in stages:
+        problems.append("COLLSCAN")
+    # 정렬이 인덱스로 처리되지 않으면 SORT stage 또는 pipeline의 $sort stage가 남음
+    if sorted_query and ("SORT" in stages or _find_values(explain.get("stages", []), "$sort")):
+        problems.append("in-memory SORT")
+    if any(scans for scans in _find_values(explain, "collectionScans")):
+        problems.append("COLLSCAN in $lookup")
+    return problems
+
+
+async def verify_query_plans(database):
+    """
+    build_hot_queries()의 실행 계획을 확인해 문제가 있는 쿼리 목록 반환
+    """
+    failures = []
+    for query in build_hot_queries():
+        collection_name = query["collection"]
+        if "pipeline" in query:
+            explain = await database.command(
+                {"explain": {"aggregate": collection_name, "pipeline": query["pipeline"], "cursor": {}}, "verbosity": "executionStats"}
+            )
+            sorted_query = any("$sort" in stage for stage in query["pipeline"])
+        else:
+            cursor = database[collection_name].find(query["filter"], query.get("projection"))
+            if query.get("sort"):
+                cursor = cursor.sort(query["sort"])
+            explain = await cursor.explain()
+            sorted_query = bool(query.get("sort"))
+
+        problems = _plan_problems(explain, sorted_query)
+        if problems:
+            failures.append({**query, "problems": problems})
+    return failures
+
+
+async def _main():
+    from db.database import db
+
+    await ensure_indexes(db)
+    failures = await verify_query_plans(db)
+    for item in failures:
+        print(f"{', '.join(item['problems'])}: {item}")
+    return 1 if failures else 0
+
+
+# python -m db.indexes : 인덱스 생성 후 주요 쿼리 실행 계획 검증 (COLLSCAN, in-memory SORT 발견 시 exit code 1)
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main()))
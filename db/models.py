@@ -3,10 +3,12 @@ from pydantic import BaseModel, HttpUrl, Field, EmailStr, field_validator, Valid
 from typing import List, Optional, Literal
 from typing_extensions import Self
 from datetime import datetime
-from bson import ObjectId
 from enum import Enum
 
 from fastapi import HTTPException
+import orjson
+
+from utils.json_response import dumps_bson
 
 """
 user
@@ -148,6 +150,7 @@ class Product(BaseModel):
     bookmark_counts: Optional[int] = 0
     shop_urls: Optional[List[Product_ShopUrl]] = []  # 각 상점 URL 정보
     main_image_url: Optional[str] = ""  # 이미지 URL
+    images: Optional[dict] = {}  # 이미지 변형 URL {original, card, detail, zoom, placeholder}. upload-image에서 생성
     cheapest: Optional[List[Product_Cheapest]] = []  # 가격 이력 리스트
     upload: bool = False
 
@@ -195,6 +198,12 @@ class Bookmark(BaseModel):
 
 class BookmarkCreate(BaseModel):
     product_id: str
+
+class BookmarkStatusRequest(BaseModel):
+    product_ids: List[str] = Field(default_factory=list, max_length=1000)
+
+class ImageIngestRequest(BaseModel):
+    image_urls: List[str] = Field(default_factory=list, max_length=100)
     
 """
 filter & category
@@ -320,31 +329,10 @@ class Product_Price(BaseModel):
 
 
 # Object Type to STR변환_ list 형식
+# orjson으로 한 번에 인코딩/디코딩 (ObjectId -> str, NaN/inf -> None, datetime -> ISO 문자열)
+# 응답으로 바로 보낼 문서는 sanitize_data 대신 BSONJSONResponse 사용
 def sanitize_data(data):
-    sanitized_data = []
-    for item in data:
-        sanitized_item = {}
-        for key, value in item.items():
-            if isinstance(value, ObjectId):
-                sanitized_item[key] = str(value)
-            elif isinstance(value, float):
-                if value == float('inf') or value == float('-inf') or value != value:
-                    sanitized_item[key] = None
-                else:
-                    sanitized_item[key] = value
-            elif isinstance(value, dict):
-                sanitized_item[key] = sanitize_data([value])[0]
-            elif isinstance(value, list):
-                sanitized_item[key] = [
-                    str(v) if isinstance(v, ObjectId)
-                    else sanitize_data([v])[0] if isinstance(v, dict)
-                    else v
-                    for v in value
-                ]
-            else:
-                sanitized_item[key] = value
-        sanitized_data.append(sanitized_item)
-    return sanitized_data
+    return orjson.loads(dumps_bson(data))
 
 class URLRequest(BaseModel):
     url: str
\ No newline at end of file
@@ -1,21 +1,82 @@
 import os
+import base64
+import hashlib
 from urllib.parse import unquote, urlparse
 from dotenv import load_dotenv
-import requests
-
-from azure.identity import DefaultAzureCredential
-from azure.storage.blob import BlobServiceClient, ContentSettings
+from fastapi import HTTPException, UploadFile
 import mimetypes
 
 load_dotenv()
 
-def get_blob_service_client():
+"""
+Blob 클라이언트
+
+credential과 BlobServiceClient는 프로세스에서 한 번만 만들어 재사용 (토큰 캐시, 커넥션 풀 공유)
+- API 서버: 처음 이미지를 올리거나 지울 때 async 클라이언트 생성, lifespan 종료 시 close_blob_client()로 정리
+- 크롤링 스크립트 등 동기 코드: get_blob_service_client()의 동기 클라이언트 사용
+- azure_storage_connection_string이 설정되어 있으면 credential 대신 connection string 사용 (로컬 Azurite 등)
+- azure SDK(aiohttp 포함)는 import 비용이 크므로 클라이언트를 만들 때 import (관리자 API에서만 사용)
+
+API에서 올리는 이미지는 내용 해시를 blob 이름에 포함하고 덮어쓰지 않음
+같은 이름의 내용이 바뀌지 않으므로 브라우저/CDN이 1년간 캐시 (IMMUTABLE_CACHE_CONTROL)
+"""
+
+# 업로드 파일을 나눠 올리는 블록 크기, 이미지 최대 크기
+BLOB_UPLOAD_CHUNK_SIZE = int(os.getenv("BLOB_UPLOAD_CHUNK_SIZE", 4 * 1024 * 1024))
+IMAGE_UPLOAD_MAX_BYTES = int(os.getenv("IMAGE_UPLOAD_MAX_BYTES", 20 * 1024 * 1024))
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_blob_service_client = None
+_async_blob_service_client = None
+_async_credential = None
+
+
+def _get_storage_url() -> str:
     azureStorage_url = os.getenv("azure_storage_url")
     if not azureStorage_url or not isinstance(azureStorage_url, str):
         raise ValueError("azure_storage_url 환경 변수가 설정되지 않았거나 유효하지 않습니다.")
-    
-    credential = DefaultAzureCredential()
-    return BlobServiceClient(azureStorage_url, credential=credential)
+    return azureStorage_url
+
+
+def get_blob_service_client():
+    global _blob_service_client
+    if _blob_service_client is None:
+        from azure.identity import DefaultAzureCredential
+        from azure.storage.blob import BlobServiceClient
+
+        connection_string = os.getenv("azure_storage_connection_string")
+        if connection_string:
+            _blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+        else:
+            _blob_service_client = BlobServiceClient(_get_storage_url(), credential=DefaultAzureCredential())
+    return _blob_service_client
+
+
+def get_async_blob_service_client():
+    """프로세스에서 공유하는 async 클라이언트. 아직 없으면 생성"""
+    global _async_blob_service_client, _async_credential
+    if _async_blob_service_client is None:
+        from azure.identity.aio import DefaultAzureCredential as AsyncDefaultAzureCredential
+        from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
+
+        connection_string = os.getenv("azure_storage_connection_string")
+        if connection_string:
+            _async_blob_service_client = AsyncBlobServiceClient.from_connection_string(connection_string)
+        else:
+            _async_credential = AsyncDefaultAzureCredential()
+            _async_blob_service_client = AsyncBlobServiceClient(_get_storage_url(), credential=_async_credential)
+    return _async_blob_service_client
+
+
+async def close_blob_client():
+    """lifespan 종료 시 호출. 커넥션 풀과 credential 정리"""
+    global _async_blob_service_client, _async_credential
+    if _async_blob_service_client is not None:
+        await _async_blob_service_client.close()
+        _async_blob_service_client = None
+    if _async_credential is not None:
+        await _async_credential.close()
+        _async_credential = None
 
 def get_content_type(filename):
     mime_type, _ = mimetypes.guess_type(filename)
@@ -40,21 +101,88 @@ def upload_image_to_blob(container_name: str, image_path: str, blob_name: str):
     print(f"이미지 '{blob_name}'가 '{container_name}' 컨테이너에 업로드되었습니다.")
     return blob_client.url
 
-def upload_imgFile_to_blob(container_name, file_data, blob_name):
-    blob_service_client = get_blob_service_client()
+def content_addressed_name(blob_name: str, digest: str) -> str:
+    """blob 이름 확장자 앞에 내용 해시 추가 (product/a/b.png -> product/a/b.{hash 16자리}.png)"""
+    base, ext = os.path.splitext(blob_name)
+    return f"{base}.{digest[:16]}{ext}"
+
+async def upload_imgFile_to_blob(container_name, file_data, blob_name, cache_control: str = None):
+    blob_service_client = get_async_blob_service_client()
     blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_name)
     
+    from azure.storage.blob import ContentSettings
+
     # MIME 타입 설정 (예: image/png)
     content_type = get_content_type(blob_name)
-    content_settings = ContentSettings(content_type=content_type)
+    content_settings = ContentSettings(content_type=content_type, cache_control=cache_control)
     try:
-        blob_client.upload_blob(file_data, overwrite=True,content_settings=content_settings)
+        await blob_client.upload_blob(file_data, overwrite=True,content_settings=content_settings)
     except Exception as e:
         print(f"Blob 업로드 중 오류 발생: {str(e)}")
         return None
     return blob_client.url
 
+async def get_existing_blob_url(container_name: str, blob_name: str):
+    """blob이 이미 있으면 url, 없으면 None"""
+    blob_service_client = get_async_blob_service_client()
+    blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_name)
+    if await blob_client.exists():
+        return blob_client.url
+    return None
+
+def _too_large(max_size: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"이미지 크기는 {max_size} bytes를 넘을 수 없습니다.")
+
+async def _hash_upload_file(upload_file: UploadFile, max_size: int) -> str:
+    # 크기 확인 + sha256 계산 (청크 단위로 읽고 처음 위치로 되돌림)
+    digest = hashlib.sha256()
+    total_size = 0
+    await upload_file.seek(0)
+    while chunk := await upload_file.read(BLOB_UPLOAD_CHUNK_SIZE):
+        total_size += len(chunk)
+        if total_size > max_size:
+            raise _too_large(max_size)
+        digest.update(chunk)
+    await upload_file.seek(0)
+    return digest.hexdigest()
+
+async def upload_stream_to_blob(container_name: str, upload_file: UploadFile, blob_name: str, max_size: int = IMAGE_UPLOAD_MAX_BYTES):
+    """
+    UploadFile을 메모리에 모두 읽지 않고 BLOB_UPLOAD_CHUNK_SIZE씩 블록으로 올린 뒤 commit
+
+    blob 이름에 내용 해시를 붙여 저장하고(content_addressed_name) 같은 내용이 이미 있으면 업로드 생략
+    max_size를 넘으면 413
+    """
+    if upload_file.size is not None and upload_file.size > max_size:
+        raise _too_large(max_size)
+
+    blob_name = content_addressed_name(blob_name, await _hash_upload_file(upload_file, max_size))
+    existing_url = await get_existing_blob_url(container_name, blob_name)
+    if existing_url:
+        return existing_url
+
+    from azure.storage.blob import BlobBlock, ContentSettings
+
+    blob_service_client = get_async_blob_service_client()
+    blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_name)
+
+    blocks = []
+    total_size = 0
+    while chunk := await upload_file.read(BLOB_UPLOAD_CHUNK_SIZE):
+        total_size += len(chunk)
+        if total_size > max_size:
+            raise _too_large(max_size)
+        block_id = base64.b64encode(f"{len(blocks):08d}".encode()).decode()
+        await blob_client.stage_block(block_id, chunk, length=len(chunk))
+        blocks.append(BlobBlock(block_id=block_id))
+
+    content_settings = ContentSettings(content_type=get_content_type(blob_name), cache_control=IMMUTABLE_CACHE_CONTROL)
+    await blob_client.commit_block_list(blocks, content_settings=content_settings)
+    return blob_client.url
+
 def upload_image_to_blob_with_url(container_name: str, image_url: str, blob_name: str):
+    import requests
+
     blob_service_client = get_blob_service_client()
     container_client = blob_service_client.get_container_client(container=container_name)
     image_file = requests.get(image_url).content
@@ -63,20 +191,27 @@ def upload_image_to_blob_with_url(container_name: str, image_url: str, blob_name
     print(f"이미지 '{blob_name}'가 '{container_name}' 컨테이너에 업로드되었습니다.")
     return blob_client.url
 
-def delete_blob_by_url(container_name: str, blob_url):
-    blob_service_client = get_blob_service_client()
+def get_blob_name_from_url(container_url: str, blob_url: str) -> str:
+    """blob url에서 컨테이너 이후 경로(blob 이름) 추출"""
+    container_path = urlparse(container_url).path.rstrip('/')
+    blob_path = urlparse(blob_url).path
+    if blob_path.startswith(container_path + '/'):
+        # Azurite처럼 경로에 계정명이 포함된 url도 처리
+        return unquote(blob_path[len(container_path) + 1:])
+    # container_name = parsed_url.path.split('/')[1]
+    return unquote('/'.join(blob_path.split('/')[2:]))
+
+async def delete_blob_by_url(container_name: str, blob_url):
+    blob_service_client = get_async_blob_service_client()
     container_client = blob_service_client.get_container_client(container=container_name)
 
-    parsed_url = urlparse(blob_url)
-    
-    # container_name = parsed_url.path.split('/')[1]
-    blob_name = '/'.join(parsed_url.path.split('/')[2:])
+    blob_name = get_blob_name_from_url(container_client.url, blob_url)
     print(blob_name)
     # BlobClient 생성
     try:
-        container_client.delete_blob(blob_name, delete_snapshots="include")
+        await container_client.delete_blob(blob_name, delete_snapshots="include")
         print(f"Blob '{blob_name}' 삭제 완료")
         return True
     except Exception as e:
         print(f"Blob 삭제 중 오류 발생: {str(e)}")
-        return False
\ No newline at end of file
+        return False
@@ -1,10 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends
+import base64
+import json
+from fastapi import APIRouter, HTTPException, Depends, Query
 from db.database import db
-from db.models import Bookmark, sanitize_data, Product
-from typing import List
+from db.models import Bookmark, BookmarkStatusRequest
+from typing import List, Optional
 from datetime import datetime
 from router.user.token import allow_admin, get_current_user
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from utils.product_card import PRODUCT_CARD_PROJECT_STAGE, build_product_card
+from utils.bookmark_status import get_bookmarked_product_ids
+from utils.json_response import BSONJSONResponse
+from utils.bookmark_counter import record_bookmark_delta, reconcile_bookmark_counts
 
 router = APIRouter(
     prefix="/bookmarks",
@@ -15,26 +22,30 @@ router = APIRouter(
 @router.post("/create-bookmark/{product_id}", response_model=Bookmark)
 async def create_bookmark(product_id: str, current_user: dict = Depends(get_current_user)):
     email = current_user["email"]
-    # 이미 북마크했는지 확인
-    exist = await db["bonre_bookmarks"].find_one({"email": email, "product_id": product_id})
-    if exist:
-        raise HTTPException(status_code=400, detail="이미 북마크한 상품입니다.")
-    
-    # bonre_products의 bookmark_counts +1
-    product = await db["bonre_products"].find_one({"_id": ObjectId(product_id)})
+    product = await db["bonre_products"].find_one({"_id": ObjectId(product_id)}, {"_id": 1})
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    current_count = product.get("bookmark_counts", 0)
-    await db["bonre_products"].update_one({"_id": ObjectId(product_id)}, {"$set": {"bookmark_counts": current_count + 1}})
-    
-    # 북마크 생성
+
+    # 북마크 생성 (없을 때만 삽입하는 upsert, 동시 요청은 email, product_id unique 인덱스로 방지)
     data = {
         "_id": ObjectId(),
         "email": email,
         "product_id": product_id,
         "created_at": datetime.utcnow()
     }
-    await db["bonre_bookmarks"].insert_one(data)
+    try:
+        result = await db["bonre_bookmarks"].update_one(
+            {"email": email, "product_id": product_id},
+            {"$setOnInsert": {"_id": data["_id"], "created_at": data["created_at"]}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="이미 북마크한 상품입니다.")
+    if result.upserted_id is None:
+        raise HTTPException(status_code=400, detail="이미 북마크한 상품입니다.")
+
+    # bonre_products의 bookmark_counts +1 (주기적으로 모아서 반영)
+    record_bookmark_delta(product_id, 1)
     return Bookmark.from_mongo(data)
 
 # 북마크 전체 조회 (admin만)
@@ -50,59 +61,108 @@ async def get_my_bookmarks(current_user: dict = Depends(get_current_user)):
     bookmarks = await db["bonre_bookmarks"].find({"email": email}).to_list(1000)
     return [Bookmark.from_mongo(b) for b in bookmarks]
 
+def encode_bookmark_cursor(bookmark: dict) -> str:
+    """마지막 북마크의 (created_at, _id)를 cursor 토큰으로 변환"""
+    key = [bookmark["created_at"].isoformat(), str(bookmark["_id"])]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def build_bookmark_cursor_match(cursor: str) -> dict:
+    """cursor 이후(created_at 내림차순)의 북마크만 조회하는 조건. 잘못된 토큰이면 400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, bookmark_id = json.loads(base64.urlsafe_b64decode(padded))
+        created_at, bookmark_id = datetime.fromisoformat(created_at), ObjectId(bookmark_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="유효하지 않은 cursor입니다.")
+    return {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": bookmark_id}},
+        ]
+    }
+
+
+def build_bookmark_products_pipeline(email: str, limit: int, cursor: Optional[str] = None) -> list:
+    """내 북마크 상품 aggregate pipeline. 북마크 목록에서 상품 카드까지 한 번에 조회 (db.indexes의 실행 계획 검증에서도 사용)"""
+    match_stage = {"email": email}
+    if cursor:
+        match_stage.update(build_bookmark_cursor_match(cursor))
+
+    return [
+        {"$match": match_stage},
+        {"$sort": {"created_at": -1, "_id": -1}},
+        {"$limit": limit},
+        {
+            "$lookup": {
+                "from": "bonre_products",
+                "let": {"product_id": {"$convert": {"input": "$product_id", "to": "objectId", "onError": None, "onNull": None}}},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$_id", "$$product_id"]}}},
+                    PRODUCT_CARD_PROJECT_STAGE,
+                ],
+                "as": "product",
+            }
+        },
+    ]
+
+
 # 내 북마크의 상품 정보 조회
 @router.get("/me/products")
-async def get_my_bookmarks_products(current_user: dict = Depends(get_current_user)):
+async def get_my_bookmarks_products(
+    limit: int = Query(1000, ge=1, le=1000, description="조회할 상품 수"),
+    cursor: Optional[str] = Query(None, description="이전 응답의 X-Next-Cursor 헤더 값"),
+    current_user: dict = Depends(get_current_user)
+):
     """
-    현재 로그인한 사용자의 북마크한 상품들의 정보를 반환하는 API
+    현재 로그인한 사용자의 북마크한 상품들의 정보를 최근 북마크 순으로 반환하는 API
+
+    다음 페이지가 있으면 X-Next-Cursor 응답 헤더에 cursor를 담아 반환
 
     output: 북마크한 상품들의 정보 리스트
     """
     email = current_user["email"]
-    
-    # 사용자의 북마크 목록 조회
-    bookmarks = await db["bonre_bookmarks"].find({"email": email}).to_list(1000)
-    if not bookmarks:
-        return []
-    
-    # 북마크된 상품들의 id 목록
-    product_ids = [ObjectId(bookmark["product_id"]) for bookmark in bookmarks]
-    
-    # 상품 정보 조회
-    items = await db["bonre_products"].find({"_id": {"$in": product_ids}}).to_list(1000)
-    if not items:
-        return []
-        
-    filtered_items = [
-        {
-            "_id": str(item["_id"]),
-            "name_kr": item["name_kr"],
-            "name": item["name"],
-            "brand": item["brand"],
-            "main_image_url": item["main_image_url"],
-            "cheapest": str(
-                item["cheapest"][-1]["price"] if item.get("cheapest") and len(item["cheapest"]) > 0 else None)
-        }
-        for item in items
-    ]
-    return filtered_items
+
+    pipeline = build_bookmark_products_pipeline(email, limit, cursor)
+    bookmarks = await db["bonre_bookmarks"].aggregate(pipeline).to_list(limit)
+    if len(bookmarks) == limit:
+        headers = {"X-Next-Cursor": encode_bookmark_cursor(bookmarks[-1])}
+    else:
+        headers = None
+
+    filtered_items = [build_product_card(bookmark["product"][0]) for bookmark in bookmarks if bookmark["product"]]
+    return BSONJSONResponse(filtered_items, headers=headers)
+
+# 여러 상품의 북마크 여부 조회
+@router.post("/me/status")
+async def get_my_bookmark_status(request: BookmarkStatusRequest, current_user: dict = Depends(get_current_user)):
+    """
+    여러 상품의 북마크 여부를 한 번에 반환하는 API
+
+    input : product_ids {List[str]}
+
+    output : bookmarked {product_id: bool}
+    """
+    bookmarked_ids = await get_bookmarked_product_ids(current_user["email"], request.product_ids)
+    return {"bookmarked": {product_id: product_id in bookmarked_ids for product_id in request.product_ids}}
 
 # 북마크 삭제
 @router.delete("/delete-bookmark/{product_id}")
 async def delete_bookmark(product_id: str, current_user: dict = Depends(get_current_user)):
     email = current_user["email"]
-    bookmark = await db["bonre_bookmarks"].find_one({"email": email, "product_id": product_id})
+    bookmark = await db["bonre_bookmarks"].find_one_and_delete({"email": email, "product_id": product_id})
     if not bookmark:
         raise HTTPException(status_code=404, detail="북마크를 찾을 수 없습니다.")
-    
-    # bonre_products의 bookmark_counts -1
-    product = await db["bonre_products"].find_one({"_id": ObjectId(product_id)})
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    current_count = product.get("bookmark_counts", 0)
-    new_count = max(current_count - 1, 0)
-    await db["bonre_products"].update_one({"_id": ObjectId(product_id)}, {"$set": {"bookmark_counts": new_count}})
-    
-    await db["bonre_bookmarks"].delete_one({"_id": bookmark["_id"]})
+
+    # bonre_products의 bookmark_counts -1 (주기적으로 모아서 반영, 0 미만으로 내려가지 않음)
+    record_bookmark_delta(product_id, -1)
     return {"message": "북마크가 삭제되었습니다."}
 
+# 북마크 수 재계산 (admin만)
+@router.post("/reconcile-counts", dependencies=[Depends(allow_admin)])
+async def reconcile_counts():
+    """
+    bonre_bookmarks를 집계해 모든 상품의 bookmark_counts를 다시 계산하는 API
+    """
+    result = await reconcile_bookmark_counts()
+    return {"message": "Bookmark counts reconciled successfully", **result}
@@ -2,9 +2,11 @@ import os
 
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
 
-from db.database import db
-from db.models import Brand, BrandUpdate, sanitize_data
-from db.storage import upload_imgFile_to_blob, delete_blob_by_url
+from db.database import db, catalog_db, ensure_collection
+from db.models import Brand, BrandUpdate
+from db.storage import delete_blob_by_url, upload_stream_to_blob
+from utils.product_card import BRAND_PRODUCTS_SORT, PRODUCT_CARD_PROJECTION, build_product_card
+from utils.json_response import BSONJSONResponse
 
 from router.user.token import allow_admin
 
@@ -19,12 +21,9 @@ async def get_all_brands():
     """
     bonre_brands 컬렉션에 있는 모든 브랜드 정보를 반환하는 API
     """
-    collections = await db.list_collection_names()
-    if "bonre_brands" not in collections:
-        raise HTTPException(status_code=404, detail="Collection not found")
-    items = await db["bonre_brands"].find().to_list(1000)
-    sanitized_items = sanitize_data(items)
-    return sanitized_items
+    await ensure_collection("bonre_brands")
+    items = await catalog_db["bonre_brands"].find().to_list(1000)
+    return BSONJSONResponse(items)
 
 
 # brand_id를 받아서 해당 브랜드 정보를 반환하는 API
@@ -38,9 +37,9 @@ async def get_brand_info_by_brand_id(brand_id: str):
 
     output : brand info {all fields}
     """
-    item = await db["bonre_brands"].find_one({"_id": brand_id})
+    item = await catalog_db["bonre_brands"].find_one({"_id": brand_id})
     if item is not None:
-        return item
+        return BSONJSONResponse(item)
     raise HTTPException(status_code=404, detail="Item not found")
 
 
@@ -53,23 +52,12 @@ async def get_products_info_by_brand_id(brand_id: str):
 
     input : brand_id {str} ex) brand_andtrandition
 
-    output : product list of brand_id {_id, name_kr, name, brand, main_image_url, cheapest}
+    output : product list of brand_id {_id, name_kr, name, subname, subname_kr, brand, main_image_url, cheapest}
     """
-    items = await db["bonre_products"].find({"brand": brand_id,"upload": True}).sort({"name":1,"subname":1}).to_list(10)
+    items = await catalog_db["bonre_products"].find({"brand": brand_id,"upload": True}, PRODUCT_CARD_PROJECTION).sort(BRAND_PRODUCTS_SORT).to_list(10)
     if items:
-        filtered_items = [
-            {
-                "_id": str(item["_id"]),
-                "name_kr": item["name_kr"],
-                "name": item["name"],
-                "brand": item["brand"],
-                "main_image_url": item["main_image_url"],
-                "cheapest": str(
-                    item["cheapest"][-1]["price"] if item.get("cheapest") and len(item["cheapest"]) > 0 else None)
-            }
-            for item in items
-        ]
-        return filtered_items
+        filtered_items = [build_product_card(item) for item in items]
+        return BSONJSONResponse(filtered_items)
     raise HTTPException(status_code=404, detail="Items not found")
 
 # brand 생성 API
@@ -102,7 +90,6 @@ async def upload_brand_image(
             raise HTTPException(status_code=404, detail="brand not found")
 
         img_storage_name = os.getenv("img_blob_name")
-        img_content = await image.read()
         original_filename = image.filename
         
         if auto_set_name:
@@ -111,18 +98,21 @@ async def upload_brand_image(
         else:
             img_name = f"brand_logos/{original_filename}"
 
-        # 기존 이미지 삭제
-        if brand_item.get("brand_image_url"):
-            delete_blob_by_url(img_storage_name, brand_item["brand_image_url"])
+        # 파일을 나눠서 스트리밍 업로드 (blob 이름에 내용 해시가 붙음)
+        img_url = await upload_stream_to_blob(img_storage_name, image, img_name)
 
-        img_url = upload_imgFile_to_blob(img_storage_name, img_content, img_name)
-            
         # 데이터베이스 업데이트
         await db["bonre_brands"].update_one(
             {"_id": brand_id},
             {"$set": {"brand_image_url": img_url}}
         )
+        # url을 바꾼 뒤 이전 이미지 삭제 (내용이 같아 url이 그대로면 유지)
+        if brand_item.get("brand_image_url") and brand_item["brand_image_url"] != img_url:
+            await delete_blob_by_url(img_storage_name, brand_item["brand_image_url"])
+
         return {"message": "Image uploaded successfully", "image_url": img_url}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error uploading image: {str(e)}")
 
@@ -153,7 +143,7 @@ async def delete_brand(brand_id: str):
     if brand_item and brand_item.get("brand_image_url"):
         try:
             img_storage_name = os.getenv("img_blob_name")
-            delete_blob_by_url(img_storage_name, brand_item["brand_image_url"])
+            await delete_blob_by_url(img_storage_name, brand_item["brand_image_url"])
         except Exception as e:
             return {"message": f"Error deleting image: {str(e)}"}
         
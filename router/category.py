@@ -1,9 +1,10 @@
 from fastapi import APIRouter, HTTPException, Depends
 
-from db.database import db
+from db.database import db, ensure_collection
 from db.models import Category, CategoryUpdate
 
 from router.user.token import allow_admin
+from utils.json_response import BSONJSONResponse
 
 
 router = APIRouter(
@@ -16,11 +17,9 @@ async def get_all_categories():
     """
     bonre_categories 컬렉션에 있는 모든 필터 정보를 반환하는 API
     """
-    collections = await db.list_collection_names()
-    if "bonre_categories" not in collections:
-        raise HTTPException(status_code=404, detail="Collection not found")
+    await ensure_collection("bonre_categories")
     items = await db["bonre_categories"].find().to_list(1000)
-    return items
+    return BSONJSONResponse(items)
 
 @router.get("/{category_id}")
 async def get_category_info_by_category_id(category_id: str):
@@ -33,7 +32,7 @@ async def get_category_info_by_category_id(category_id: str):
     """
     item = await db["bonre_categories"].find_one({"_id": category_id})
     if item is not None:
-        return item
+        return BSONJSONResponse(item)
     raise HTTPException(status_code=404, detail="Item not found")
 
 @router.post("/create-category", dependencies=[Depends(allow_admin)])
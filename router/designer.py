@@ -1,9 +1,10 @@
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
 
-from db.database import db
+from db.database import db, ensure_collection
 from db.models import Designer, DesignerUpdate
 
 from router.user.token import allow_admin
+from utils.json_response import BSONJSONResponse
 
 router = APIRouter(
     prefix="/designer",
@@ -15,11 +16,9 @@ async def get_all_designers():
     """
     bonre_designers 컬렉션에 있는 모든 디자이너 정보를 반환하는 API
     """
-    collections = await db.list_collection_names()
-    if "bonre_designers" not in collections:
-        raise HTTPException(status_code=404, detail="Collection not found")
+    await ensure_collection("bonre_designers")
     items = await db["bonre_designers"].find().to_list(1000)
-    return items
+    return BSONJSONResponse(items)
 
 
 @router.get("/{designer_id}")
@@ -33,7 +32,7 @@ async def get_designer_info_by_designer_id(designer_id: str):
     """
     item = await db["bonre_designers"].find_one({"_id": designer_id})
     if item is not None:
-        return item
+        return BSONJSONResponse(item)
     raise HTTPException(status_code=404, detail="Item not found")
 
 
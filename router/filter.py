@@ -1,9 +1,10 @@
 from fastapi import APIRouter, HTTPException, Depends
 
-from db.database import db
+from db.database import db, ensure_collection
 from db.models import Filter, FilterUpdate
 
 from router.user.token import allow_admin
+from utils.json_response import BSONJSONResponse
 
 router = APIRouter(
     prefix="/filter",
@@ -15,11 +16,9 @@ async def get_all_filters():
     """
     bonre_filters 컬렉션에 있는 모든 필터 정보를 반환하는 API
     """
-    collections = await db.list_collection_names()
-    if "bonre_filters" not in collections:
-        raise HTTPException(status_code=404, detail="Collection not found")
+    await ensure_collection("bonre_filters")
     items = await db["bonre_filters"].find().to_list(1000)
-    return items
+    return BSONJSONResponse(items)
 
 @router.get("/{filter_id}")
 async def get_filter_info_by_filter_id(filter_id: str):
@@ -32,7 +31,7 @@ async def get_filter_info_by_filter_id(filter_id: str):
     """
     item = await db["bonre_filters"].find_one({"_id": filter_id})
     if item is not None:
-        return item
+        return BSONJSONResponse(item)
     raise HTTPException(status_code=404, detail="Item not found")
 
 @router.post("/create-filter", dependencies=[Depends(allow_admin)])
@@ -3,7 +3,6 @@ from db.database import db
 
 from fastapi import APIRouter, HTTPException, Depends
 
-from router.crawling.price.price_crawling import get_all_info
 from router.user.token import allow_admin
 
 from datetime import datetime
@@ -86,6 +85,9 @@ async def update_prices_with_id(product_id: str):
     if not shops_urls:
         raise HTTPException(status_code=400, detail="No shops_url found for this product")
 
+    # 크롤링 모듈(selenium, bs4 등)은 가격 업데이트 시에만 import
+    from router.crawling.price.price_crawling import get_all_info
+
     current_date = datetime.now().strftime("%Y-%m-%d")
     price_records = []
 
@@ -147,6 +149,8 @@ async def update_prices_all():
     if not products:
         raise HTTPException(status_code=404, detail="No products found")
 
+    from router.crawling.price.price_crawling import get_all_info
+
     updated_count = 0
     for product in products:
         product_id = str(product["_id"])
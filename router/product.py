@@ -3,15 +3,21 @@ from math import ceil
 from datetime import datetime, timedelta
 from bson import ObjectId
 from typing import Optional
+from pymongo import ReturnDocument
 
-from fastapi import APIRouter, HTTPException, Depends, Query, UploadFile, File, Form, FastAPI, Body
+from fastapi import APIRouter, HTTPException, Depends, Query, UploadFile, File, Form, FastAPI, Body, BackgroundTasks
 
-from db.database import db
-from db.models import Product, ProductUpdate, Product_Period, sanitize_data
+from db.database import db, catalog_db, ensure_collection
+from db.models import Product, ProductUpdate, Product_Period, ImageIngestRequest
 
-from db.storage import delete_blob_by_url, upload_imgFile_to_blob
-from router.user.token import allow_admin
-from utils.product_search import search_products, get_search_suggestions_db
+from db.storage import upload_stream_to_blob
+from router.user.token import allow_admin, get_optional_user_email
+from utils.json_response import BSONJSONResponse
+from utils.product_search import search_products, get_search_suggestions_db, build_duplicate_check_query
+from utils.product_card import BRAND_PRODUCTS_SORT, PRODUCT_CARD_PROJECTION, build_product_card
+from utils.image_variants import create_image_variants_from_upload, delete_product_images
+from utils.image_ingest import ingest_images, is_external_image_url, rehost_product_image
+from utils.product_counts import apply_product_count_change, verify_upload_counts, rebuild_upload_counts
 
 router = APIRouter(
     prefix="/product",
@@ -45,31 +51,16 @@ async def get_total(product_id: str):
 
 
     product = await db["bonre_products"].find_one({"_id": ObjectId(product_id)})
-    if product:
-        product = sanitize_data([product])[0]
     designer = await db["bonre_designers"].find_one({"_id": product['designer'][0]}) if product['designer'] else None
     if not designer:
         designer = None
     brand = await db["bonre_brands"].find_one({"_id": product['brand']}) if product['brand'] else None
     if not brand:
         brand = None
-    products = await db["bonre_products"].find({"brand": product['brand'],"upload": True}).sort({"name":1,"subname":1}).to_list(10) if product['brand'] else None
+    products = await db["bonre_products"].find({"brand": product['brand'],"upload": True}, PRODUCT_CARD_PROJECTION).sort(BRAND_PRODUCTS_SORT).to_list(10) if product['brand'] else None
     prices = await db["bonre_prices"].find({"product_id": product_id}).to_list(1000) if product['brand'] else None
     if products:
-        filtered_products = [
-            {
-                "_id": str(item["_id"]),
-                "name_kr": item["name_kr"],
-                "name": item["name"],
-                "subname": item["subname"],
-                "subname_kr": item["subname_kr"],
-                "brand": item["brand"],
-                "main_image_url": item["main_image_url"],
-                "cheapest": str(
-                    item["cheapest"][-1]["price"] if item.get("cheapest") and len(item["cheapest"]) > 0 else None)
-            }
-            for item in products
-        ]
+        filtered_products = [build_product_card(item) for item in products]
     else:
         products = None
         
@@ -96,7 +87,7 @@ async def get_total(product_id: str):
     #     "prices": filtered_prices
     # }))
 
-    return {"product": product, "designer": designer, "brand": brand, "brand_products": filtered_products, "prices": filtered_prices}
+    return BSONJSONResponse({"product": product, "designer": designer, "brand": brand, "brand_products": filtered_products, "prices": filtered_prices})
         
         
 #############
@@ -106,22 +97,52 @@ async def get_total(product_id: str):
 # bonre_products 컬렉션에 있는 모든 상품 정보를 반환하는 API
 @router.get("")
 async def get_all_products():
-    collections = await db.list_collection_names()
-    if "bonre_products" not in collections:
-        raise HTTPException(status_code=404, detail="Collection not found")
+    await ensure_collection("bonre_products")
 
     items = await db["bonre_products"].find().to_list(1000)
-    sanitized_items = sanitize_data(items)
-    return sanitized_items
+    return BSONJSONResponse(items)
 
 @router.get("/home")
 async def get_products_list_in_page(
     page: int = 1,
     limit: int = 20,
     category_id: Optional[str] = Query(None, description="카테고리 ID"),
-    query: Optional[str] = Query(None, description="검색어")
+    query: Optional[str] = Query(None, description="검색어"),
+    cursor: Optional[str] = Query(None, description="이전 응답의 next_cursor. 주어지면 page 대신 cursor 이후 항목 조회"),
+    user_email: Optional[str] = Depends(get_optional_user_email)
 ):
-    return await search_products(page, limit, category_id, query)
+    """
+    로그인한 경우 각 상품에 is_bookmarked 표시
+    """
+    return BSONJSONResponse(await search_products(page, limit, category_id, query, cursor, user_email))
+
+@router.get("/admin/counts", dependencies=[Depends(allow_admin)])
+async def verify_product_counts():
+    """
+    홈 목록에서 사용하는 업로드 상품 개수 테이블(전체/카테고리별)을 전체 재집계 결과와 비교하는 API
+
+    output : consistent{bool}, mismatches{key: {stored, recounted}}, counts{재집계 결과}
+    """
+    return await verify_upload_counts()
+
+@router.post("/admin/counts/rebuild", dependencies=[Depends(allow_admin)])
+async def rebuild_product_counts():
+    """
+    업로드 상품 개수 테이블을 전체 재집계 결과로 다시 생성하는 API
+    """
+    counts = await rebuild_upload_counts()
+    return {"message": "Product counts rebuilt successfully", "counts": counts}
+
+@router.post("/admin/ingest-images", dependencies=[Depends(allow_admin)])
+async def ingest_product_images(request: ImageIngestRequest):
+    """
+    외부 이미지 url(쇼핑몰 검색 결과 등)을 동시에 내려받아 blob storage에 저장하는 API
+
+    input : image_urls{최대 100개}
+
+    output : images{원본 url: 저장된 url, 실패한 경우 null}
+    """
+    return {"images": await ingest_images(request.image_urls)}
 
 @router.get("/duplicate-check")
 async def check_product_duplicate(product_name: str = Query(..., description="제품명"), product_sub_name: str = Query(None, description="제품 서브네임")):
@@ -135,16 +156,9 @@ async def check_product_duplicate(product_name: str = Query(..., description="
     Returns:
         dict: 중복 여부와 중복된 제품 정보
     """
-    # 검색 조건 구성
-    query = {
-        "name_kr": product_name,
-        "upload": True
-    }
-    
-    # 서브네임이 제공된 경우에만 조건에 추가
-    if product_sub_name:
-        query["subname_kr"] = product_sub_name
-    
+    # 검색 조건 구성 (서브네임이 제공된 경우에만 조건에 추가)
+    query = build_duplicate_check_query(product_name, product_sub_name)
+
     # DB에서 제품 검색
     products = await db["bonre_products"].find(query).to_list(1000)
     
@@ -172,8 +186,7 @@ async def check_product_duplicate(product_name: str = Query(..., description="
 async def get_product(product_id: str):
     product = await db["bonre_products"].find_one({"_id": ObjectId(product_id)})
     if product:
-        sanitized_data = sanitize_data([product])[0]
-        return sanitized_data
+        return BSONJSONResponse(product)
     raise HTTPException(status_code=404, detail="항목을 찾을 수 없습니다.")
 
 
@@ -222,7 +235,7 @@ async def get_cheapest_prices(product_id: str, period: Product_Period):
     param period: 선택된 기간 (1주일, 1달, 1년, 전체)
     """
     # MongoDB에서 제품 데이터 조회
-    product = await db["bonre_products"].find_one({"_id": ObjectId(product_id)})
+    product = await catalog_db["bonre_products"].find_one({"_id": ObjectId(product_id)}, {"cheapest": 1})
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
@@ -276,7 +289,7 @@ async def get_cheapest_prices(product_id: str, period: Product_Period):
 
 
 @router.post("/create-product", dependencies=[Depends(allow_admin)])
-async def create_product(product: Product):
+async def create_product(product: Product, background_tasks: BackgroundTasks):
     """
     product 생성 API
 
@@ -298,6 +311,7 @@ async def create_product(product: Product):
     ## 주의
 
     ### main_image_url : json과 다른 방식으로 upload를 해야해서, 임의로 이미지 업로드 API를 분리했음. /product/upload-image/{product_id}로 업로드, 업데이트 수행
+    ### 외부 이미지 url을 main_image_url로 넣으면 응답 후 백그라운드에서 blob storage로 옮기고 변형 이미지 생성
 
     cheapest: List[Product_Cheapest]
 
@@ -308,6 +322,9 @@ async def create_product(product: Product):
     # img을 파일로 받아서 azure blob에 저장 -> 저장된 url 반환
     try:
         result = await db["bonre_products"].insert_one(product_item)
+        await apply_product_count_change(None, product_item)
+        if is_external_image_url(product_item.get("main_image_url")):
+            background_tasks.add_task(rehost_product_image, str(result.inserted_id), product_item["main_image_url"])
         return {"message": "Product created successfully",
             "product_id": str(result.inserted_id)
             }
@@ -333,7 +350,6 @@ async def upload_product_image(
             raise HTTPException(status_code=404, detail="Product not found")
 
         img_storage_name = os.getenv("img_blob_name")
-        img_content = await image.read()
         original_filename = image.filename
         
         name, ext = os.path.splitext(original_filename)
@@ -344,19 +360,23 @@ async def upload_product_image(
         else:
             img_name = f"product/{product_item['brand']}/{name}_{product_item['subname']}{ext}"
 
-        # 기존 이미지 삭제
-        if product_item.get("main_image_url"):
-            delete_blob_by_url(img_storage_name, product_item["main_image_url"])
-        
-        img_url = upload_imgFile_to_blob(img_storage_name, img_content, img_name)
-            
+        # 파일을 나눠서 스트리밍 업로드 (blob 이름에 내용 해시가 붙음)
+        img_url = await upload_stream_to_blob(img_storage_name, image, img_name)
+
+        # 목록/상세/확대용 WebP 변형 생성 (업로드 파일을 임시 파일로 복사해 worker에서 읽음)
+        images = await create_image_variants_from_upload(img_storage_name, img_url, img_name, image)
+
         # 데이터베이스 업데이트
         await db["bonre_products"].update_one(
             {"_id": ObjectId(product_id)},
-            {"$set": {"main_image_url": img_url}}
+            {"$set": {"main_image_url": img_url, "images": images}}
         )
+        # url을 바꾼 뒤 이전 이미지 삭제 (내용이 같아 url이 그대로면 유지)
+        await delete_product_images(img_storage_name, product_item, keep=images)
 
-        return {"message": "Image uploaded successfully", "image_url": img_url}
+        return {"message": "Image uploaded successfully", "image_url": img_url, "images": images}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error uploading image: {str(e)}")
     
@@ -373,16 +393,20 @@ async def update_product(product_id: str, productUpdate: ProductUpdate):
     """
 
     try:
-        product_item = await db["bonre_products"].find_one({"_id": ObjectId(product_id)})
+        object_id = ObjectId(product_id)
     except Exception as e:
         raise HTTPException(status_code=404, detail="Product not found")
 
     try:
         update_data = {k: v for k, v in productUpdate.dict(exclude_unset=True).items() if v is not None}
-        await db["bonre_products"].update_one(
-            {"_id": ObjectId(product_id)},
-            {"$set": update_data}
+        # 수정 직전 문서를 같은 연산으로 받아 개수 변경분 계산 (동시 수정 시에도 각자 실제 이전 상태 기준)
+        product_item = await db["bonre_products"].find_one_and_update(
+            {"_id": object_id},
+            {"$set": update_data},
+            return_document=ReturnDocument.BEFORE
         )
+        if product_item and ("upload" in update_data or "category" in update_data):
+            await apply_product_count_change(product_item, {**product_item, **update_data})
         return {"message": f"Product updated successfully. {update_data}"}
     except Exception as e:
         return {"message": "No fields to update"}
@@ -397,11 +421,12 @@ async def delete_product(product_id: str):
     if product_item and product_item.get("main_image_url"):
         try:
             img_storage_name = os.getenv("img_blob_name")
-            delete_blob_by_url(img_storage_name, product_item["main_image_url"])
+            await delete_product_images(img_storage_name, product_item)
         except Exception as e:
             return {"message": f"Error deleting image: {str(e)}"}
     result = await db["bonre_products"].delete_one({"_id": ObjectId(product_id)})
     if result.deleted_count == 1:
+        await apply_product_count_change(product_item, None)
         return {"message": "Product deleted successfully"}
     raise HTTPException(status_code=404, detail="Product not found")
 
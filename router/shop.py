@@ -9,14 +9,13 @@ import re
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, FastAPI, Query
 import httpx
 
-from db.database import db
+from db.database import db, ensure_collection
 from db.models import Shop, ShopUpdate
 
-from db.storage import delete_blob_by_url, upload_imgFile_to_blob
-from router.crawling.shop_search.search_result import run_search
+from db.storage import delete_blob_by_url, upload_stream_to_blob
 from router.user.token import allow_admin
+from utils.json_response import BSONJSONResponse
 
-from router.crawling.shop_search.search_parsers import shop_list
 
 router = APIRouter(
     prefix="/shop",
@@ -28,11 +27,9 @@ async def get_all_shops():
     """
     bonre_shops 컬렉션에 있는 모든 샵 정보를 반환하는 API
     """
-    collections = await db.list_collection_names()
-    if "bonre_shops" not in collections:
-        raise HTTPException(status_code=404, detail="Collection not found")
+    await ensure_collection("bonre_shops")
     items = await db["bonre_shops"].find().to_list(1000)
-    return items
+    return BSONJSONResponse(items)
 
 ##############
 ## Crawling ##
@@ -65,6 +62,9 @@ def process_site_name(site: str) -> str:
 
 @router.get("/admin-search", dependencies=[Depends(allow_admin)])
 async def search(keyword: str = Query("놀", description="검색어"), number: int = Query(2, description="사이트당 결과 수")):
+    # 크롤링 모듈(selenium, bs4 등)은 검색 시에만 import
+    from router.crawling.shop_search.search_result import run_search
+
     # 1. 여러 사이트에서 검색 결과 가져오기
     search_results = run_search(keyword, number)
     
@@ -110,6 +110,8 @@ async def search(
     q: str,
     brand_id: str = Query(..., description="필터링할 브랜드 ID (예: brand_louispoulsen)")
 ):
+    from router.crawling.shop_search.search_parsers import shop_list
+
     url = os.getenv("BRAVE_SEARCH_URL")
     x_subscription_token = os.getenv("BRAVE_SEARCH_API_KEY")
     
@@ -193,7 +195,7 @@ async def get_shop_info_by_shop_id(shop_id: str):
     """
     item = await db["bonre_shops"].find_one({"_id": shop_id})
     if item is not None:
-        return item
+        return BSONJSONResponse(item)
     raise HTTPException(status_code=404, detail="Item not found")
 
 # shop 생성 API
@@ -226,7 +228,6 @@ async def upload_shop_image(
             raise HTTPException(status_code=404, detail="shop not found")
 
         img_storage_name = os.getenv("img_blob_name")
-        img_content = await image.read()
         original_filename = image.filename
         
         if auto_set_name:
@@ -235,19 +236,21 @@ async def upload_shop_image(
         else:
             img_name = f"shop_logos/{original_filename}"
 
-        # 기존 이미지 삭제
-        if shop_item.get("shop_image_url"):
-            delete_blob_by_url(img_storage_name, shop_item["shop_image_url"])
+        # 파일을 나눠서 스트리밍 업로드 (blob 이름에 내용 해시가 붙음)
+        img_url = await upload_stream_to_blob(img_storage_name, image, img_name)
 
-        img_url = upload_imgFile_to_blob(img_storage_name, img_content, img_name)
-                    
         # 데이터베이스 업데이트
         await db["bonre_shops"].update_one(
             {"_id": shop_id},
             {"$set": {"shop_image_url": img_url}}
         )
+        # url을 바꾼 뒤 이전 이미지 삭제 (내용이 같아 url이 그대로면 유지)
+        if shop_item.get("shop_image_url") and shop_item["shop_image_url"] != img_url:
+            await delete_blob_by_url(img_storage_name, shop_item["shop_image_url"])
 
         return {"message": "Image uploaded successfully", "image_url": img_url}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error uploading image: {str(e)}")
 
@@ -278,7 +281,7 @@ async def delete_shop(shop_id: str):
     if shop_item and shop_item.get("shop_image_url"):
         try:
             img_storage_name = os.getenv("img_blob_name")
-            delete_blob_by_url(img_storage_name, shop_item["shop_image_url"])
+            await delete_blob_by_url(img_storage_name, shop_item["shop_image_url"])
         except Exception as e:
             return {"message": f"Error deleting image: {str(e)}"}
         
@@ -1,4 +1,3 @@
-import os
 import random
 from datetime import datetime, timedelta
 from typing import Optional
@@ -6,20 +5,11 @@ from fastapi import HTTPException
 from pydantic import EmailStr
 from db.database import db
 from db.models import EmailVerification, EmailVerificationResponse
-import emails
-from emails.template import JinjaTemplate
+from router.user.mail_queue import enqueue_email
 from dotenv import load_dotenv
 
 load_dotenv()  # 환경 변수 로드
 
-# 이메일 설정
-SMTP_HOST = os.getenv("SMTP_HOST")
-SMTP_PORT = os.getenv("SMTP_PORT")
-SMTP_USER = os.getenv("SMTP_USER")
-SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
-EMAILS_FROM_EMAIL = SMTP_USER  # SMTP_USER와 동일한 이메일 주소 사용
-EMAILS_FROM_NAME = "bonle"    # 발신자 표시 이름
-
 def create_verification_token(email: str) -> str:
     """5자리 숫자 인증 코드 생성"""
     return str(random.randint(10000, 99999))
@@ -57,35 +47,8 @@ async def send_verification_email(email: str, token: str):
     </html>
     """
     
-    message = emails.Message(
-        subject="이메일 인증",
-        html=html_content,
-        mail_from=(EMAILS_FROM_NAME, EMAILS_FROM_EMAIL),
-    )
-    
-    # SMTP 설정
-    smtp_options = {
-        "host": SMTP_HOST,
-        "port": SMTP_PORT,
-        "tls": True,
-        "user": SMTP_USER,
-        "password": SMTP_PASSWORD,
-    }
-    
-    try:
-        response = message.send(
-            to=email,
-            render={"token": token},
-            smtp=smtp_options
-        )
-        if response.status_code not in [250, 200, 201, 202]:
-            # 이메일 발송 실패 시 저장된 토큰 삭제
-            await db["email_verifications"].delete_one({"email": email, "token": token})
-            raise HTTPException(status_code=500, detail="이메일 발송에 실패했습니다.")
-    except Exception as e:
-        # 이메일 발송 실패 시 저장된 토큰 삭제
-        await db["email_verifications"].delete_one({"email": email, "token": token})
-        raise HTTPException(status_code=500, detail=f"이메일 발송 중 오류가 발생했습니다: {str(e)}")
+    # 발송 큐에 저장 (실제 발송은 백그라운드 워커가 처리)
+    await enqueue_email(email, "이메일 인증", html_content)
 
 async def verify_email(verification: EmailVerification) -> EmailVerificationResponse:
     """이메일 인증 처리"""
@@ -0,0 +1,186 @@
+import os
+import asyncio
+import logging
+import smtplib
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import formataddr
+
+from pymongo import ReturnDocument
+
+from db.database import db
+
+logger = logging.getLogger(__name__)
+
+"""
+메일 발송 큐
+
+요청 처리 중에는 email_outbox 컬렉션에 메일을 저장만 하고, 백그라운드 워커가 SMTP로 발송
+- SMTP 연결은 워커가 유지하며 재사용 (끊기면 다시 연결)
+- 실패 시 MAIL_MAX_ATTEMPTS까지 지수 백오프로 재시도, 이후 failed 처리
+- 서버가 발송 중에 종료되어 sending 상태로 남은 메일은 일정 시간 후 다시 pending으로 복구
+"""
+
+SMTP_HOST = os.getenv("SMTP_HOST")
+SMTP_PORT = int(os.getenv("SMTP_PORT") or 587)
+SMTP_USER = os.getenv("SMTP_USER")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+# 로컬 테스트용 SMTP 서버(aiosmtpd 등)는 STARTTLS 없이 사용
+SMTP_TLS = os.getenv("SMTP_TLS", "true").lower() == "true"
+SMTP_TIMEOUT_SECONDS = int(os.getenv("SMTP_TIMEOUT_SECONDS", 30))
+
+EMAILS_FROM_EMAIL = SMTP_USER  # SMTP_USER와 동일한 이메일 주소 사용
+EMAILS_FROM_NAME = "bonle"    # 발신자 표시 이름
+
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", 5))
+MAIL_RETRY_BASE_SECONDS = int(os.getenv("MAIL_RETRY_BASE_SECONDS", 30))
+MAIL_QUEUE_POLL_SECONDS = int(os.getenv("MAIL_QUEUE_POLL_SECONDS", 5))
+MAIL_SENDING_TIMEOUT = timedelta(minutes=5)
+
+OUTBOX_COLLECTION = "email_outbox"
+
+
+class SMTPConnection:
+    """재사용되는 SMTP 연결. 워커 스레드에서만 사용"""
+
+    def __init__(self):
+        self._smtp = None
+
+    def _connect(self):
+        self.close()
+        smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT_SECONDS)
+        if SMTP_TLS:
+            smtp.starttls()
+        if SMTP_USER and SMTP_PASSWORD:
+            smtp.login(SMTP_USER, SMTP_PASSWORD)
+        self._smtp = smtp
+
+    def send(self, message: EmailMessage):
+        if self._smtp is None:
+            self._connect()
+        try:
+            self._smtp.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # 유휴 상태에서 서버가 연결을 끊은 경우 다시 연결 후 한 번 더 시도
+            self._connect()
+            self._smtp.send_message(message)
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+
+_connection = SMTPConnection()
+_wake_event = asyncio.Event()
+_worker_task: asyncio.Task | None = None
+
+
+async def enqueue_email(to: str, subject: str, html: str):
+    """메일을 발송 큐에 저장하고 워커를 깨움"""
+    now = datetime.utcnow()
+    result = await db[OUTBOX_COLLECTION].insert_one({
+        "to": to,
+        "subject": subject,
+        "html": html,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now,
+    })
+    _wake_event.set()
+    return result.inserted_id
+
+
+def _build_message(item: dict) -> EmailMessage:
+    message = EmailMessage()
+    message["Subject"] = item["subject"]
+    message["From"] = formataddr((EMAILS_FROM_NAME, EMAILS_FROM_EMAIL))
+    message["To"] = item["to"]
+    message.set_content(item["html"], subtype="html")
+    return message
+
+
+async def _claim_next():
+    now = datetime.utcnow()
+    return await db[OUTBOX_COLLECTION].find_one_and_update(
+        {"status": "pending", "next_attempt_at": {"$lte": now}},
+        {"$set": {"status": "sending", "locked_at": now}, "$inc": {"attempts": 1}},
+        sort=[("next_attempt_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def _recover_stuck():
+    await db[OUTBOX_COLLECTION].update_many(
+        {"status": "sending", "locked_at": {"$lt": datetime.utcnow() - MAIL_SENDING_TIMEOUT}},
+        {"$set": {"status": "pending"}},
+    )
+
+
+async def process_outbox() -> int:
+    """발송 가능한 메일을 모두 발송하고 처리한 메일 수 반환"""
+    processed = 0
+    while item := await _claim_next():
+        processed += 1
+        try:
+            await asyncio.to_thread(_connection.send, _build_message(item))
+        except Exception as e:
+            logger.error(f"Failed to send email to {item['to']} (attempt {item['attempts']}): {e}")
+            if item["attempts"] >= MAIL_MAX_ATTEMPTS:
+                update = {"status": "failed", "last_error": str(e)}
+            else:
+                delay = MAIL_RETRY_BASE_SECONDS * 2 ** (item["attempts"] - 1)
+                update = {
+                    "status": "pending",
+                    "last_error": str(e),
+                    "next_attempt_at": datetime.utcnow() + timedelta(seconds=delay),
+                }
+            await db[OUTBOX_COLLECTION].update_one({"_id": item["_id"]}, {"$set": update})
+            continue
+
+        await db[OUTBOX_COLLECTION].update_one(
+            {"_id": item["_id"]},
+            {"$set": {"status": "sent", "sent_at": datetime.utcnow()}, "$unset": {"html": ""}},
+        )
+    return processed
+
+
+async def _run_worker():
+    while True:
+        _wake_event.clear()
+        try:
+            await _recover_stuck()
+            await process_outbox()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in mail queue worker: {e}", exc_info=True)
+
+        try:
+            await asyncio.wait_for(_wake_event.wait(), timeout=MAIL_QUEUE_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_mail_worker():
+    """lifespan 시작 시 호출"""
+    global _worker_task
+    if _worker_task is None or _worker_task.done():
+        _worker_task = asyncio.create_task(_run_worker())
+
+
+async def stop_mail_worker():
+    """lifespan 종료 시 호출"""
+    global _worker_task
+    if _worker_task is not None:
+        _worker_task.cancel()
+        try:
+            await _worker_task
+        except asyncio.CancelledError:
+            pass
+        _worker_task = None
+    await asyncio.to_thread(_connection.close)
@@ -0,0 +1,67 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+"""
+비밀번호 해시 / 검증
+
+bcrypt는 한 번에 수백 ms가 걸리므로 이벤트 루프에서 직접 실행하지 않고 전용 스레드 풀에서 실행
+동시에 실행되는 해시 작업은 PASSWORD_HASH_CONCURRENCY개로 제한되고, 초과분은 풀의 대기열에서 기다림
+"""
+
+PASSWORD_HASH_CONCURRENCY = int(os.getenv("PASSWORD_HASH_CONCURRENCY", 4))
+
+# 프로세스 전체에서 공유하는 CryptContext
+crypt = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_CONCURRENCY, thread_name_prefix="password-hash")
+
+# 이벤트 루프에서만 갱신되는 통계
+_stats = {"in_flight": 0, "max_in_flight": 0, "completed": 0}
+
+
+def _salt() -> str:
+    salt = os.getenv("SALT")
+    if salt is None:
+        raise HTTPException(
+            status_code=500,
+            detail="서버 설정 오류: SALT 환경 변수가 설정되지 않았습니다."
+        )
+    return salt
+
+
+async def _run_in_pool(func, *args):
+    _stats["in_flight"] += 1
+    _stats["max_in_flight"] = max(_stats["max_in_flight"], _stats["in_flight"])
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+    finally:
+        _stats["in_flight"] -= 1
+        _stats["completed"] += 1
+
+
+async def hash_password(plain_password: str) -> str:
+    return await _run_in_pool(crypt.hash, plain_password + _salt())
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_pool(crypt.verify, plain_password + _salt(), hashed_password)
+
+
+def get_password_hasher_stats() -> dict:
+    """
+    해시 스레드 풀 상태
+
+    in_flight: 실행 중 + 대기 중인 작업 수, queued: 그 중 대기 중인 작업 수
+    """
+    in_flight = _stats["in_flight"]
+    return {
+        "concurrency": PASSWORD_HASH_CONCURRENCY,
+        "in_flight": in_flight,
+        "queued": max(in_flight - PASSWORD_HASH_CONCURRENCY, 0),
+        "max_in_flight": _stats["max_in_flight"],
+        "completed": _stats["completed"],
+    }
@@ -1,49 +1,120 @@
 import os
+import time
+import uuid
+import hashlib
 
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
 
 from datetime import datetime, timedelta
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 
 from db.database import db
 from db.models import sanitize_data
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="user/login")
+# 로그인하지 않아도 호출 가능한 API용 (토큰이 없으면 None)
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="user/login", auto_error=False)
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+credentials_exception = HTTPException(
+    status_code=401,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+def decode_access_token(token: str) -> dict:
+    """
+    JWT 검증 후 payload 반환. 유효하지 않거나 sub(email)가 없으면 401
+    """
     secret_key = os.getenv("SECRET_KEY")
     algorithm = os.getenv("ALGORITHM")
-    credentials_exception = HTTPException(
-        status_code=401,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
     try:
         payload = jwt.decode(token, secret_key, algorithms=[algorithm])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError:
         raise credentials_exception
-        
+    if payload.get("sub") is None:
+        raise credentials_exception
+    return payload
+
+"""
+인증된 사용자 캐시
+
+토큰(jti, 없으면 토큰 해시)별로 조회한 사용자 정보를 PRINCIPAL_CACHE_TTL_SECONDS 동안 보관해 요청마다 DB 조회를 하지 않음
+권한 변경, 비밀번호 변경, 탈퇴 시 invalidate_user_cache(email)로 삭제 (프로세스 단위 캐시이므로 다른 워커는 TTL 후 반영)
+"""
+
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 60))
+PRINCIPAL_CACHE_MAX_ENTRIES = 10000
+
+# cache key -> (만료 시각, user)
+_principal_cache: dict[str, tuple[float, dict]] = {}
+# email -> cache key 목록 (사용자 단위 삭제용)
+_principal_keys_by_email: dict[str, set[str]] = {}
+
+def _principal_cache_key(token: str, payload: dict) -> str:
+    return payload.get("jti") or hashlib.sha256(token.encode()).hexdigest()
+
+def invalidate_user_cache(email: str):
+    """사용자의 캐시된 인증 정보 삭제"""
+    for key in _principal_keys_by_email.pop(email, set()):
+        _principal_cache.pop(key, None)
+
+def _cache_principal(key: str, user: dict):
+    if len(_principal_cache) >= PRINCIPAL_CACHE_MAX_ENTRIES:
+        _principal_cache.clear()
+        _principal_keys_by_email.clear()
+    _principal_cache[key] = (time.monotonic() + PRINCIPAL_CACHE_TTL_SECONDS, user)
+    _principal_keys_by_email.setdefault(user["email"], set()).add(key)
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    # 토큰 서명, 만료는 매 요청 검증
+    payload = decode_access_token(token)
+    email: str = payload["sub"]
+
+    key = _principal_cache_key(token, payload)
+    cached = _principal_cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        return dict(cached[1])
+
     user = await db["bonre_users"].find_one({"email": email})
     if user is None:
         raise credentials_exception
-    return sanitize_data([user])[0]
+    user = sanitize_data([user])[0]
+    _cache_principal(key, user)
+    return dict(user)
+
+async def get_optional_user_email(token: str | None = Depends(oauth2_scheme_optional)) -> str | None:
+    """
+    토큰이 있고 유효하면 email, 없거나 유효하지 않으면 None (DB 조회 없이 토큰만 검증)
+    """
+    if not token:
+        return None
+    try:
+        return decode_access_token(token)["sub"]
+    except HTTPException:
+        return None
 
 class RoleChecker:
     def __init__(self, allowed_roles: list):
         self.allowed_roles = allowed_roles
 
-    def __call__(self, current_user: dict = Depends(get_current_user)):
+    def _forbidden(self):
+        return HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="접근 권한이 없습니다.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    async def __call__(self, token: str = Depends(oauth2_scheme)):
+        # 토큰의 role claim으로 먼저 거절 (DB 조회 없음)
+        role = decode_access_token(token).get("role")
+        if role is not None and role not in self.allowed_roles:
+            raise self._forbidden()
+
+        # 허용된 role이면 현재 권한 확인 (캐시된 사용자 정보, 권한 변경 시 캐시 삭제됨)
+        current_user = await get_current_user(token)
         if current_user["role"] not in self.allowed_roles:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="접근 권한이 없습니다.",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+            raise self._forbidden()
 
 allow_admin = RoleChecker(["admin"])
 
@@ -57,20 +128,7 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, secret_key, algorithm=algorithm)
     
     return encoded_jwt
-
-def define_crypt():
-    crypt = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    return crypt
-
-def verify_password(plain_password, hashed_password, crypt: CryptContext = define_crypt()):
-    salt = os.getenv("SALT")
-    if salt is None:
-        raise HTTPException(
-            status_code=500,
-            detail="서버 설정 오류: SALT 환경 변수가 설정되지 않았습니다."
-        )
-    return crypt.verify(plain_password + salt, hashed_password)
\ No newline at end of file
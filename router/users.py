@@ -9,20 +9,18 @@ from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
 
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from urllib.parse import unquote
 from dotenv import load_dotenv
 
-from router.user.token import create_access_token, define_crypt, oauth2_scheme, verify_password, get_current_user
+from router.user.token import create_access_token, oauth2_scheme, get_current_user, invalidate_user_cache
+from router.user.password import hash_password, verify_password
 from router.user.email_verification import create_verification_token, send_verification_email, verify_email
 from router.user.token import allow_admin
+from utils.json_response import BSONJSONResponse
 
 # 환경 변수 로드
 load_dotenv()
 
-# 비밀번호 해시 컨텍스트 설정
-crypt = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 router = APIRouter(
     prefix="/user",
     tags=["user CRUD"]
@@ -58,7 +56,7 @@ async def get_users(email: str):
     try:
         user = await db["bonre_users"].find_one({"email": email})
         if user:
-            return {"exists": True, "user": sanitize_data([user])[0]}
+            return BSONJSONResponse({"exists": True, "user": user})
         else:
             return {"exists": False}
     except Exception as e:
@@ -130,7 +128,7 @@ async def resend_verification_email(email: str):
 
 
 @router.post("/create-user", tags=["user CRUD"])
-async def create_user(create_user_data: CreateUser, crypt: CryptContext = Depends(define_crypt)):
+async def create_user(create_user_data: CreateUser):
     # 1. CreateUser 포맷으로 받은 데이터를 딕셔너리로 변환
     user_dict = create_user_data.dict(by_alias=True)
     
@@ -161,7 +159,7 @@ async def create_user(create_user_data: CreateUser, crypt: CryptContext = Depend
         raise HTTPException(status_code=400, detail=str(e))
 
     # 6. 비밀번호 해시 처리
-    user_dict["password"] = crypt.hash(user_dict["password"]+os.getenv("SALT"))
+    user_dict["password"] = await hash_password(user_dict["password"])
     
     # 7. User 모델로 변환 및 검증
     try:
@@ -178,7 +176,7 @@ async def create_user(create_user_data: CreateUser, crypt: CryptContext = Depend
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/update-password-token", tags=["user CRUD"])
-async def update_password(password: UserPasswordUpdate, current_user: dict = Depends(get_current_user), crypt: CryptContext = Depends(define_crypt)):
+async def update_password(password: UserPasswordUpdate, current_user: dict = Depends(get_current_user)):
     """
     비밀번호 변경 API (로그인 상태)
 
@@ -196,7 +194,7 @@ async def update_password(password: UserPasswordUpdate, current_user: dict = Dep
         raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다.")
 
     # 현재 비밀번호 검증
-    if not verify_password(password.current_password, user["password"]):
+    if not await verify_password(password.current_password, user["password"]):
         raise HTTPException(status_code=401, detail="현재 비밀번호가 일치하지 않습니다.")
 
     # 새 비밀번호와 확인 비밀번호 일치 여부 확인
@@ -204,19 +202,20 @@ async def update_password(password: UserPasswordUpdate, current_user: dict = Dep
         raise HTTPException(status_code=422, detail="새 비밀번호와 확인 비밀번호가 일치하지 않습니다.")
 
     # 새 비밀번호가 현재 비밀번호와 동일한지 확인
-    if verify_password(password.new_password, user["password"]):
+    if await verify_password(password.new_password, user["password"]):
         raise HTTPException(status_code=422, detail="새 비밀번호는 현재 비밀번호와 달라야 합니다.")
 
     # 새 비밀번호 해시 처리 후 업데이트
-    hashed_new_password = crypt.hash(password.new_password + os.getenv("SALT"))
+    hashed_new_password = await hash_password(password.new_password)
     await db["bonre_users"].update_one(
         {"email": current_user["email"]}, 
         {"$set": {"password": hashed_new_password}}
     )
+    invalidate_user_cache(current_user["email"])
     return {"message": "비밀번호가 성공적으로 변경되었습니다."}
 
 @router.post("/update-password-email-verification", tags=["user CRUD"])
-async def update_password_email_verification(password: UserPasswordUpdate, email: str, crypt: CryptContext = Depends(define_crypt)):
+async def update_password_email_verification(password: UserPasswordUpdate, email: str):
     """
     이메일 인증을 통한 비밀번호 변경 API (비밀번호 분실 시)
 
@@ -245,11 +244,12 @@ async def update_password_email_verification(password: UserPasswordUpdate, email
         raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다.")
 
     # 새 비밀번호 해시 처리 후 업데이트
-    hashed_new_password = crypt.hash(password.new_password + os.getenv("SALT"))
+    hashed_new_password = await hash_password(password.new_password)
     await db["bonre_users"].update_one(
         {"email": email}, 
         {"$set": {"password": hashed_new_password}}
     )
+    invalidate_user_cache(email)
     
     # 인증 토큰 삭제
     await db["email_verifications"].delete_one({"email": email})
@@ -269,7 +269,7 @@ async def login_user(login_form: OAuth2PasswordRequestForm = Depends()):
         )
         
     # 비밀번호 검증
-    if not verify_password(login_form.password, user["password"]):
+    if not await verify_password(login_form.password, user["password"]):
         raise HTTPException(
             status_code=401,
             detail="Invalid email or password",
@@ -315,6 +315,7 @@ async def change_user_role(
             {"email": email},
             {"$set": {"role": new_role}}
         )
+        invalidate_user_cache(email)
         
         if result.modified_count == 0:
             raise HTTPException(status_code=400, detail="권한 변경에 실패했습니다.")
@@ -351,6 +352,7 @@ async def update_terms_agreement(
                 "privacy_terms_agreed": privacy_terms_agreed
             }}
         )
+        invalidate_user_cache(current_user["email"])
         
         if result.modified_count == 0:
             raise HTTPException(status_code=400, detail="약관 동의 상태 변경에 실패했습니다.")
@@ -378,6 +380,7 @@ async def delete_user(current_user: dict = Depends(get_current_user)):
 
     # 사용자 삭제
     await db["bonre_users"].delete_one({"email": current_user["email"]})
+    invalidate_user_cache(current_user["email"])
     return {"message": "User deleted successfully"}
 
 
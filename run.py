@@ -1,14 +1,17 @@
 import os
+import asyncio
+from contextlib import asynccontextmanager
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from datetime import datetime
 from pytz import timezone
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import URL, MutableHeaders
 from starlette.responses import RedirectResponse
 
 # Import routers
@@ -23,42 +26,100 @@ from router.category import router as category_router
 from router.brand import router as brand_router
 from router.bookmark import router as bookmark_router
 
-app = FastAPI()
+import db.database as database
+from db.database import init_db, close_db, ping_db
+from db.storage import close_blob_client
+from utils.image_variants import shutdown_image_pool
+from utils.image_ingest import close_ingest_client
+from utils.product_counts import ensure_upload_counts
+from utils.json_response import BSONJSONResponse
+from utils.http_cache import HTTPCacheMiddleware
+from utils.compression import CompressionMiddleware, get_compression_stats
+from router.user.password import get_password_hasher_stats
+from router.user.mail_queue import start_mail_worker, stop_mail_worker
+from utils.bookmark_counter import BOOKMARK_FLUSH_INTERVAL_SECONDS, flush_bookmark_counts, reconcile_bookmark_counts
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 인덱스 생성, 컬렉션 목록 캐시, 상품 개수 테이블 등 DB 초기화 (성공할 때까지 백그라운드에서 재시도)
+    bootstrap_task = asyncio.create_task(bootstrap_database())
+
+    start_mail_worker()
+    schedule_bookmark_count_updates()
+    schedule_price_updates()
+    yield
+    bootstrap_task.cancel()
+    await stop_mail_worker()
+    await flush_bookmark_counts()
+    await close_ingest_client()
+    await close_blob_client()
+    shutdown_image_pool()
+    shutdown_scheduler()
+    close_db()
+
+app = FastAPI(lifespan=lifespan, default_response_class=BSONJSONResponse)
 utc = timezone('UTC')
 scheduler = AsyncIOScheduler(timezone=utc)
 
+# 보안 헤더 (모든 응답에 추가)
+SECURITY_HEADERS = {
+    # HSTS 헤더 (1년 = 31536000초)
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+    # CSP 헤더
+    "Content-Security-Policy": "default-src 'self'; script-src 'self' 'unsafe-inline' 'unsafe-eval' https://cdn.jsdelivr.net; style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; img-src 'self' data: https:; font-src 'self' data:; connect-src 'self'",
+    # XSS 보호
+    "X-XSS-Protection": "1; mode=block",
+    # 클릭재킹 방지
+    "X-Frame-Options": "DENY",
+    # MIME 타입 스니핑 방지
+    "X-Content-Type-Options": "nosniff",
+    # 리퍼러 정책
+    "Referrer-Policy": "strict-origin-when-cross-origin",
+}
+
+"""
+미들웨어는 BaseHTTPMiddleware 대신 ASGI로 직접 구현
+(요청마다 추가 task / memory stream을 만들지 않고, StreamingResponse도 그대로 전달됨)
+"""
+
 # HTTPS 리다이렉션 미들웨어
-class HTTPSRedirectMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        if not request.url.scheme == "https" and os.getenv("ENVIRONMENT") == "production":
-            url = str(request.url).replace("http://", "https://", 1)
-            return RedirectResponse(url=url, status_code=301)
-        return await call_next(request)
+class HTTPSRedirectMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["scheme"] != "https" and os.getenv("ENVIRONMENT") == "production":
+            url = str(URL(scope=scope)).replace("http://", "https://", 1)
+            response = RedirectResponse(url=url, status_code=301)
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
 
 # 보안 헤더 미들웨어
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        
-        # HSTS 헤더 (1년 = 31536000초)
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        
-        # CSP 헤더
-        response.headers["Content-Security-Policy"] = "default-src 'self'; script-src 'self' 'unsafe-inline' 'unsafe-eval' https://cdn.jsdelivr.net; style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; img-src 'self' data: https:; font-src 'self' data:; connect-src 'self'"
-        
-        # XSS 보호
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        
-        # 클릭재킹 방지
-        response.headers["X-Frame-Options"] = "DENY"
-        
-        # MIME 타입 스니핑 방지
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        
-        # 리퍼러 정책
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        
-        return response
+class SecurityHeadersMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in SECURITY_HEADERS.items():
+                    headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+# 조회 API ETag / Cache-Control (응답 본문 기준이므로 가장 안쪽에 추가)
+app.add_middleware(HTTPCacheMiddleware)
+
+# 응답 압축 (ETag별 압축 결과 캐시)
+app.add_middleware(CompressionMiddleware)
 
 # 미들웨어 추가
 app.add_middleware(HTTPSRedirectMiddleware)
@@ -74,6 +135,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 브라우저에서 읽을 수 있도록 노출할 응답 헤더 (북마크 상품 목록 cursor)
+    expose_headers=["X-Next-Cursor"],
 )
 
 # 신뢰할 수 있는 호스트 설정
@@ -99,6 +162,18 @@ FAST API 연결, MongoDB 연결 테스트
 async def read_root():
     return {"message": "welcome to bonle"}
 
+@app.get("/healthz", tags=["root"])
+async def healthz():
+    """liveness: 프로세스가 요청을 처리할 수 있으면 200"""
+    return {"status": "ok"}
+
+@app.get("/readyz", tags=["root"])
+async def readyz():
+    """readiness: DB 초기화가 끝났고 MongoDB에 연결되면 200, 아니면 503"""
+    if database.db_ready and await ping_db():
+        return {"status": "ready"}
+    return BSONJSONResponse({"status": "not ready"}, status_code=503)
+
 # Include routers
 app.include_router(user_router)
 app.include_router(total_router)
@@ -127,6 +202,27 @@ logging.getLogger('pymongo').setLevel(logging.INFO)
 
 logger = logging.getLogger(__name__)
 
+DB_BOOTSTRAP_MAX_BACKOFF_SECONDS = float(os.getenv("DB_BOOTSTRAP_MAX_BACKOFF_SECONDS", 60))
+
+async def bootstrap_database():
+    """
+    DB 초기화. 시작 시 MongoDB에 연결할 수 없으면 1초부터 두 배씩(최대 DB_BOOTSTRAP_MAX_BACKOFF_SECONDS) 기다리며 재시도
+    초기화가 끝나기 전까지 /readyz는 503
+    """
+    delay = 1.0
+    attempt = 1
+    while True:
+        try:
+            await init_db()
+            await ensure_upload_counts()
+            logger.info("Database bootstrap completed")
+            return
+        except Exception as e:
+            logger.error(f"Failed to bootstrap database (attempt {attempt}), retrying in {delay:.0f}s: {e}", exc_info=attempt == 1)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, DB_BOOTSTRAP_MAX_BACKOFF_SECONDS)
+        attempt += 1
+
 async def run_update_prices_all():
     logger.info("Starting scheduled price update task")
     current_time_utc = datetime.now(utc)
@@ -139,7 +235,37 @@ async def run_update_prices_all():
     except Exception as e:
         logger.error(f"Error in scheduled task: {e}", exc_info=True)
 
-@app.on_event("startup")
+async def run_reconcile_bookmark_counts():
+    logger.info("Starting scheduled bookmark count reconciliation")
+    try:
+        result = await reconcile_bookmark_counts()
+        logger.info(f"Bookmark count reconciliation completed: {result}")
+    except Exception as e:
+        logger.error(f"Error in bookmark count reconciliation: {e}", exc_info=True)
+
+def schedule_bookmark_count_updates():
+    try:
+        # 모아둔 북마크 수 증감값 주기적으로 반영
+        scheduler.add_job(
+            flush_bookmark_counts,
+            IntervalTrigger(seconds=BOOKMARK_FLUSH_INTERVAL_SECONDS, timezone=utc),
+            id='bookmark_count_flush_job',
+            name='Flush bookmark counts',
+            replace_existing=True,
+            coalesce=True
+        )
+        # bonre_bookmarks 기준으로 북마크 수 재계산 (가격 업데이트 전)
+        scheduler.add_job(
+            run_reconcile_bookmark_counts,
+            CronTrigger(hour=14, minute=40, timezone=utc),
+            id='bookmark_count_reconcile_job',
+            name='Reconcile bookmark counts',
+            replace_existing=True
+        )
+        logger.info("Added bookmark count jobs successfully")
+    except Exception as e:
+        logger.error(f"Failed to add bookmark count jobs: {e}", exc_info=True)
+
 def schedule_price_updates():
     try:
         logger.info("Initializing scheduler...")
@@ -180,7 +306,15 @@ async def get_scheduler_status():
     }
         
 
-@app.on_event("shutdown")
+@app.get("/password-hasher/status", tags=["user CRUD"])
+async def get_password_hasher_status():
+    return get_password_hasher_stats()
+
+@app.get("/compression/status", tags=["root"])
+async def get_compression_status():
+    return get_compression_stats()
+
+
 def shutdown_scheduler():
     try:
         scheduler.shutdown()
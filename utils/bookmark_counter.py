@@ -0,0 +1,141 @@
+import os
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from db.database import db
+
+logger = logging.getLogger(__name__)
+
+"""
+북마크 수 write-behind
+
+북마크 생성/삭제 시 bonre_products 문서를 바로 수정하지 않고 상품별 증감값을 메모리에 모아두었다가
+BOOKMARK_FLUSH_INTERVAL_SECONDS마다 bulk_write 한 번으로 반영 (인기 상품 문서에 대한 쓰기 경합 방지)
+
+워커 프로세스마다 각자 모아서 반영하고, 반영 전 종료 등으로 생긴 오차는 reconcile_bookmark_counts()로 보정
+- 증감값은 기록 시각과 함께 보관하고, reconcile은 상품마다 집계 시작 시각(bookmark_counts_at)을 기록
+- flush는 bookmark_counts_at 이후에 기록된 증감값만 더함 (그 전 증감값은 이미 집계에 포함됨)
+  다른 워커에 남아 있던 증감값이나 reconcile 도중 기록된 증감값이 두 번 반영되지 않음
+- reconcile은 bonre_job_locks의 lock을 잡은 한 워커에서만 실행
+"""
+
+BOOKMARK_FLUSH_INTERVAL_SECONDS = int(os.getenv("BOOKMARK_FLUSH_INTERVAL_SECONDS", 5))
+
+JOB_LOCKS_COLLECTION = "bonre_job_locks"
+RECONCILE_LOCK_ID = "bookmark_count_reconcile"
+RECONCILE_LOCK_TIMEOUT = timedelta(minutes=10)
+
+# product_id -> 반영되지 않은 [(기록 시각, 증감값)]
+_pending_deltas: defaultdict[str, list] = defaultdict(list)
+
+
+def record_bookmark_delta(product_id: str, delta: int):
+    """상품의 북마크 수 증감값 기록 (다음 flush 때 반영). bonre_bookmarks에 쓴 뒤 호출해야 함"""
+    _pending_deltas[product_id].append((datetime.utcnow(), delta))
+
+
+def _increment_clamped(deltas: list) -> list:
+    # bookmark_counts += (bookmark_counts_at 이후에 기록된 증감값의 합), 0 미만으로 내려가지 않도록 update pipeline 사용
+    reconciled_at = {"$ifNull": ["$bookmark_counts_at", datetime.min]}
+    return [
+        {"$set": {"bookmark_counts": {"$max": [
+            {"$add": [
+                {"$ifNull": ["$bookmark_counts", 0]},
+                *[{"$cond": [{"$gt": [recorded_at, reconciled_at]}, delta, 0]} for recorded_at, delta in deltas],
+            ]},
+            0,
+        ]}}}
+    ]
+
+
+async def flush_bookmark_counts() -> int:
+    """
+    모아둔 증감값을 bulk_write로 반영하고 반영한 상품 수 반환
+
+    실패하면 증감값을 다시 쌓아두고 다음 flush 때 재시도
+    """
+    global _pending_deltas
+    pending, _pending_deltas = _pending_deltas, defaultdict(list)
+
+    operations = [
+        UpdateOne({"_id": ObjectId(product_id)}, _increment_clamped(deltas))
+        for product_id, deltas in pending.items()
+        if deltas
+    ]
+    if not operations:
+        return 0
+
+    try:
+        await db["bonre_products"].bulk_write(operations, ordered=False)
+    except Exception as e:
+        logger.error(f"Failed to flush bookmark counts: {e}", exc_info=True)
+        for product_id, deltas in pending.items():
+            _pending_deltas[product_id].extend(deltas)
+        return 0
+    return len(operations)
+
+
+async def _acquire_reconcile_lock(owner: ObjectId) -> bool:
+    """reconcile lock 획득. 다른 워커가 잡고 있으면(만료 전) False"""
+    now = datetime.utcnow()
+    try:
+        await db[JOB_LOCKS_COLLECTION].update_one(
+            {"_id": RECONCILE_LOCK_ID, "locked_until": {"$lte": now}},
+            {"$set": {"owner": owner, "locked_until": now + RECONCILE_LOCK_TIMEOUT}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def _release_reconcile_lock(owner: ObjectId):
+    await db[JOB_LOCKS_COLLECTION].update_one(
+        {"_id": RECONCILE_LOCK_ID, "owner": owner},
+        {"$set": {"locked_until": datetime.utcnow()}},
+    )
+
+
+async def reconcile_bookmark_counts() -> dict:
+    """
+    bonre_bookmarks를 집계해 모든 상품의 bookmark_counts를 다시 계산
+
+    다른 워커에서 실행 중이면 건너뜀
+    output : updated{bookmark_counts(_at)를 갱신한 상품 수}, bookmarked_products{북마크가 있는 상품 수}, skipped{다른 워커에서 실행 중이라 건너뛰었는지}
+    """
+    owner = ObjectId()
+    if not await _acquire_reconcile_lock(owner):
+        logger.info("Bookmark count reconciliation is already running in another worker")
+        return {"updated": 0, "bookmarked_products": 0, "skipped": True}
+
+    try:
+        # 이 시각 전에 기록된 증감값은 아래 집계에 포함되므로 flush에서 제외됨
+        reconciled_at = datetime.utcnow()
+
+        pipeline = [{"$group": {"_id": "$product_id", "count": {"$sum": 1}}}]
+        counts = {item["_id"]: item["count"] async for item in db["bonre_bookmarks"].aggregate(pipeline)}
+        product_ids = [ObjectId(product_id) for product_id in counts if ObjectId.is_valid(product_id)]
+
+        # 값이 같아도 bookmark_counts_at은 모든 상품에 기록 (이전 증감값이 다시 더해지지 않도록)
+        operations = [
+            UpdateOne({"_id": ObjectId(product_id)}, {"$set": {"bookmark_counts": count, "bookmark_counts_at": reconciled_at}})
+            for product_id, count in counts.items()
+            if ObjectId.is_valid(product_id)
+        ]
+        # 북마크가 모두 삭제된 상품은 0으로
+        operations.append(
+            UpdateMany(
+                {"_id": {"$nin": product_ids}},
+                {"$set": {"bookmark_counts": 0, "bookmark_counts_at": reconciled_at}},
+            )
+        )
+
+        result = await db["bonre_products"].bulk_write(operations, ordered=False)
+        return {"updated": result.modified_count, "bookmarked_products": len(counts), "skipped": False}
+    finally:
+        await _release_reconcile_lock(owner)
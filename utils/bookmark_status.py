@@ -0,0 +1,19 @@
+from typing import Iterable
+
+from db.database import db
+
+
+async def get_bookmarked_product_ids(email: str, product_ids: Iterable[str]) -> set:
+    """
+    product_ids 중 사용자가 북마크한 product_id 집합
+
+    (email, product_id) 인덱스만으로 처리되는 covered query
+    """
+    product_ids = list(set(product_ids))
+    if not product_ids:
+        return set()
+    cursor = db["bonre_bookmarks"].find(
+        {"email": email, "product_id": {"$in": product_ids}},
+        {"_id": 0, "product_id": 1},
+    )
+    return {item["product_id"] async for item in cursor}
@@ -0,0 +1,175 @@
+import os
+import gzip
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+"""
+응답 압축 (gzip / brotli)
+
+ASGI 미들웨어로 COMPRESSION_MINIMUM_SIZE 이상인 JSON/텍스트 응답을 Accept-Encoding에 맞춰 압축
+- brotli가 설치되어 있고 클라이언트가 지원하면 br, 아니면 gzip
+- ETag가 있는 응답(HTTPCacheMiddleware)은 같은 본문이므로 (ETag, 인코딩)별 압축 결과를 LRU로 캐시해 재사용
+- 압축된 응답의 ETag는 "{etag}-{인코딩}" 형태 (If-None-Match 비교 시 접미사는 무시됨)
+- 여러 번에 나눠 보내는 StreamingResponse는 압축하지 않고 그대로 전달
+- JSON/텍스트 응답과 304에는 압축 여부와 관계없이 Vary: Accept-Encoding을 붙임
+  (압축하지 않은 응답도 공유 캐시가 인코딩별로 구분해 저장하도록)
+"""
+
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", 1024))
+COMPRESSION_CACHE_SIZE = int(os.getenv("COMPRESSION_CACHE_SIZE", 256))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+# (etag, encoding) -> 압축된 본문
+_compressed_cache: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+_stats = {"responses": 0, "cache_hits": 0, "original_bytes": 0, "compressed_bytes": 0}
+
+
+def choose_encoding(accept_encoding: str):
+    """Accept-Encoding에서 사용할 인코딩 선택 (q=0은 제외)"""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _compress_cached(body: bytes, encoding: str, etag: str | None) -> bytes:
+    if etag is None:
+        return compress(body, encoding)
+
+    key = (etag, encoding)
+    compressed = _compressed_cache.get(key)
+    if compressed is not None:
+        _compressed_cache.move_to_end(key)
+        _stats["cache_hits"] += 1
+        return compressed
+
+    compressed = compress(body, encoding)
+    _compressed_cache[key] = compressed
+    if len(_compressed_cache) > COMPRESSION_CACHE_SIZE:
+        _compressed_cache.popitem(last=False)
+    return compressed
+
+
+def get_compression_stats() -> dict:
+    """압축 응답 수, 캐시 적중 수, 압축 전후 바이트"""
+    return {**_stats, "cached_entries": len(_compressed_cache)}
+
+
+def _get_header(headers, name: bytes):
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _with_encoded_etag(headers, encoding: str) -> list:
+    # "{etag}" -> "{etag}-{encoding}"
+    return [
+        (key, f'{value.decode("latin-1")[:-1]}-{encoding}"'.encode("latin-1") if key.lower() == b"etag" else value)
+        for key, value in headers
+    ]
+
+
+def _client_has_encoded_etag(if_none_match: str, headers, encoding: str) -> bool:
+    # If-None-Match에 "{etag}-{encoding}"이 있으면 클라이언트가 압축본을 가지고 있음
+    etag = _get_header(headers, b"etag")
+    if etag is None:
+        return False
+    encoded = f'{etag[:-1]}-{encoding}"'
+    return any(tag.strip().removeprefix("W/") == encoded for tag in if_none_match.split(","))
+
+
+def _with_vary_accept_encoding(headers) -> list:
+    vary = _get_header(headers, b"vary")
+    if vary and "accept-encoding" in vary.lower():
+        return list(headers)
+    return [(key, value) for key, value in headers if key.lower() != b"vary"] + [
+        (b"vary", (f"{vary}, Accept-Encoding" if vary else "Accept-Encoding").encode("latin-1")),
+    ]
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(_get_header(scope["headers"], b"accept-encoding") or "")
+        if_none_match = _get_header(scope["headers"], b"if-none-match") or ""
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            passthrough = True
+            headers = start_message.get("headers", [])
+            body = message.get("body", b"")
+            if start_message["status"] == 304:
+                # 클라이언트가 가진 응답의 ETag와 같게 맞춤
+                # (최소 크기 미만이라 압축하지 않고 보낸 응답이면 접미사 없는 ETag 유지)
+                headers = _with_vary_accept_encoding(headers)
+                if encoding is not None and _client_has_encoded_etag(if_none_match, headers, encoding):
+                    headers = _with_encoded_etag(headers, encoding)
+                await send({**start_message, "headers": headers})
+                await send(message)
+                return
+            content_type = _get_header(headers, b"content-type") or ""
+            if not content_type.startswith(COMPRESSIBLE_TYPES) or _get_header(headers, b"content-encoding"):
+                await send(start_message)
+                await send(message)
+                return
+            if encoding is None or message.get("more_body", False) or len(body) < self.minimum_size:
+                await send({**start_message, "headers": _with_vary_accept_encoding(headers)})
+                await send(message)
+                return
+
+            etag = _get_header(headers, b"etag")
+            compressed = _compress_cached(body, encoding, etag)
+            _stats["responses"] += 1
+            _stats["original_bytes"] += len(body)
+            _stats["compressed_bytes"] += len(compressed)
+
+            new_headers = [
+                (key, value) for key, value in _with_vary_accept_encoding(_with_encoded_etag(headers, encoding))
+                if key.lower() != b"content-length"
+            ]
+            new_headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+            ]
+
+            await send({**start_message, "headers": new_headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,126 @@
+import re
+import hashlib
+
+"""
+조회 API HTTP 캐시
+
+ASGI 미들웨어로 CACHE_POLICIES에 해당하는 GET 응답에 ETag, Cache-Control을 붙이고
+If-None-Match가 ETag와 같으면 본문 없이 304 반환
+- ETag: 응답 본문의 sha256 (strong validator)
+- Authorization 헤더가 있는 요청은 사용자별 응답(북마크 여부 등)일 수 있으므로 public -> private
+- 가격은 하루 한 번 갱신되므로 가격 그래프는 길게, 나머지는 짧게 캐시하고 이후에는 304로 재검증
+"""
+
+# (경로 정규식, Cache-Control). 먼저 일치하는 정책 적용
+CACHE_POLICIES = [
+    (re.compile(r"^/product/home$"), "public, no-cache"),
+    (re.compile(r"^/product/[^/]+/cheapest-graph$"), "public, max-age=3600"),
+    (re.compile(r"^/product-all(/|$)"), "public, max-age=300"),
+    (re.compile(r"^/(brand|category|filter)(/|$)"), "public, max-age=300"),
+]
+
+
+def get_cache_policy(path: str):
+    for pattern, cache_control in CACHE_POLICIES:
+        if pattern.match(path):
+            return cache_control
+    return None
+
+
+def compute_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _strip_etag(tag: str) -> str:
+    # W/ 접두사와 압축 응답의 인코딩 접미사("...-gzip", "...-br") 제거
+    tag = tag[2:] if tag.startswith("W/") else tag
+    for suffix in ('-gzip"', '-br"'):
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match(쉼표로 구분된 목록, W/ 접두사, *)와 ETag 비교"""
+    if if_none_match.strip() == "*":
+        return True
+    return etag in [_strip_etag(tag.strip()) for tag in if_none_match.split(",")]
+
+
+def _get_header(headers, name: bytes):
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+class HTTPCacheMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        cache_control = get_cache_policy(scope["path"])
+        if cache_control is None:
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = scope["headers"]
+        if _get_header(request_headers, b"authorization"):
+            cache_control = cache_control.replace("public", "private")
+        if_none_match = _get_header(request_headers, b"if-none-match")
+
+        # 응답 본문을 모두 받은 뒤 ETag 계산
+        start_message = None
+        body_parts = []
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body_parts.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(body_parts)
+            headers = list(start_message.get("headers", []))
+            if start_message["status"] != 200 or _get_header(headers, b"etag"):
+                await send(start_message)
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            etag = compute_etag(body)
+            headers = [(key, value) for key, value in headers if key.lower() != b"cache-control"]
+            headers += [
+                (b"etag", etag.encode("latin-1")),
+                (b"cache-control", cache_control.encode("latin-1")),
+            ]
+            vary = _get_header(headers, b"vary")
+            if vary is None:
+                headers.append((b"vary", b"Authorization"))
+            elif "authorization" not in vary.lower():
+                headers = [(key, value) for key, value in headers if key.lower() != b"vary"]
+                headers.append((b"vary", f"{vary}, Authorization".encode("latin-1")))
+
+            if if_none_match and etag_matches(if_none_match, etag):
+                # 304에는 본문 관련 헤더 제외
+                headers = [
+                    (key, value) for key, value in headers
+                    if key.lower() not in (b"content-length", b"content-type")
+                ]
+                await send({"type": "http.response.start", "status": 304, "headers": headers})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
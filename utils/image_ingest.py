@@ -0,0 +1,153 @@
+import os
+import asyncio
+import hashlib
+import logging
+import mimetypes
+
+import httpx
+from bson import ObjectId
+
+from db.database import db
+from db.storage import IMAGE_UPLOAD_MAX_BYTES, IMMUTABLE_CACHE_CONTROL, get_async_blob_service_client, get_existing_blob_url, upload_imgFile_to_blob
+from utils.image_variants import create_image_variants
+
+logger = logging.getLogger(__name__)
+
+"""
+외부 이미지 재호스팅
+
+쇼핑몰 검색 결과 등 외부 이미지 url을 내려받아 blob storage에 저장
+- 공유 httpx.AsyncClient로 IMAGE_INGEST_CONCURRENCY개씩 동시에 다운로드
+- 이미지당 IMAGE_INGEST_TIMEOUT_SECONDS, IMAGE_UPLOAD_MAX_BYTES 제한 (받는 중에 초과하면 중단)
+- 내용의 sha256으로 blob 이름을 정하므로 같은 이미지는 한 번만 저장됨
+"""
+
+IMAGE_INGEST_CONCURRENCY = int(os.getenv("IMAGE_INGEST_CONCURRENCY", 8))
+IMAGE_INGEST_TIMEOUT_SECONDS = float(os.getenv("IMAGE_INGEST_TIMEOUT_SECONDS", 10))
+INGEST_BLOB_PREFIX = "ingested"
+
+_client: httpx.AsyncClient | None = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=IMAGE_INGEST_TIMEOUT_SECONDS,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=IMAGE_INGEST_CONCURRENCY),
+        )
+    return _client
+
+
+async def close_ingest_client():
+    """lifespan 종료 시 호출"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _download(url: str) -> tuple[bytes, str]:
+    async with _get_client().stream("GET", url) as response:
+        response.raise_for_status()
+        content_type = response.headers.get("content-type", "").split(";")[0].strip()
+        if not content_type.startswith("image/"):
+            raise ValueError(f"이미지가 아닙니다: {content_type}")
+        if int(response.headers.get("content-length") or 0) > IMAGE_UPLOAD_MAX_BYTES:
+            raise ValueError("이미지 크기 제한 초과")
+
+        chunks = []
+        size = 0
+        async for chunk in response.aiter_bytes():
+            size += len(chunk)
+            if size > IMAGE_UPLOAD_MAX_BYTES:
+                raise ValueError("이미지 크기 제한 초과")
+            chunks.append(chunk)
+    return b"".join(chunks), content_type
+
+
+async def download_image(url: str) -> tuple[bytes, str]:
+    """
+    이미지 다운로드 (전체 시간 IMAGE_INGEST_TIMEOUT_SECONDS 제한)
+
+    output : (data, content_type)
+    """
+    return await asyncio.wait_for(_download(url), timeout=IMAGE_INGEST_TIMEOUT_SECONDS)
+
+
+def content_blob_name(data: bytes, content_type: str) -> str:
+    """내용 해시 기반 blob 이름 (ingested/{hash 앞 2자리}/{hash}{ext})"""
+    digest = hashlib.sha256(data).hexdigest()
+    ext = mimetypes.guess_extension(content_type) or ""
+    return f"{INGEST_BLOB_PREFIX}/{digest[:2]}/{digest}{ext}"
+
+
+async def store_image(container_name: str, data: bytes, content_type: str) -> tuple[str, str]:
+    """
+    이미지 저장. 같은 내용의 blob이 이미 있으면 업로드하지 않음
+
+    output : (blob url, blob name)
+    """
+    blob_name = content_blob_name(data, content_type)
+    url = await get_existing_blob_url(container_name, blob_name)
+    if url is None:
+        url = await upload_imgFile_to_blob(container_name, data, blob_name, cache_control=IMMUTABLE_CACHE_CONTROL)
+        if url is None:
+            raise RuntimeError("이미지 업로드에 실패했습니다.")
+    return url, blob_name
+
+
+def is_external_image_url(url) -> bool:
+    """blob storage 밖의 http(s) 이미지 url인지 여부"""
+    if not url or not url.startswith(("http://", "https://")):
+        return False
+    try:
+        return not url.startswith(get_async_blob_service_client().url)
+    except ValueError:
+        # blob storage 설정이 없는 환경
+        return False
+
+
+async def ingest_images(image_urls: list[str]) -> dict:
+    """
+    외부 이미지 url들을 동시에 재호스팅
+
+    output : {원본 url: 저장된 url, 실패한 경우 None}
+    """
+    container_name = os.getenv("img_blob_name")
+    semaphore = asyncio.Semaphore(IMAGE_INGEST_CONCURRENCY)
+
+    async def ingest(url: str):
+        async with semaphore:
+            try:
+                data, content_type = await download_image(url)
+                hosted_url, _ = await store_image(container_name, data, content_type)
+                return hosted_url
+            except Exception as e:
+                logger.warning(f"Failed to ingest image {url}: {e}")
+                return None
+
+    # 같은 url은 한 번만 처리
+    unique_urls = list(dict.fromkeys(url for url in image_urls if url))
+    results = await asyncio.gather(*[ingest(url) for url in unique_urls])
+    return dict(zip(unique_urls, results))
+
+
+async def rehost_product_image(product_id: str, image_url: str):
+    """
+    상품의 외부 main_image_url을 blob storage로 옮기고 변형 이미지 생성 (BackgroundTasks에서 실행)
+
+    처리 중에 main_image_url이 바뀌었으면 덮어쓰지 않음
+    """
+    container_name = os.getenv("img_blob_name")
+    try:
+        data, content_type = await download_image(image_url)
+        hosted_url, blob_name = await store_image(container_name, data, content_type)
+        images = await create_image_variants(container_name, hosted_url, blob_name, data)
+        await db["bonre_products"].update_one(
+            {"_id": ObjectId(product_id), "main_image_url": image_url},
+            {"$set": {"main_image_url": hosted_url, "images": images}}
+        )
+    except Exception as e:
+        logger.warning(f"Failed to rehost image of product {product_id}: {e}")
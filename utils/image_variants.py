@@ -0,0 +1,148 @@
+import os
+import io
+import base64
+import asyncio
+import hashlib
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from db.database import db
+from db.storage import BLOB_UPLOAD_CHUNK_SIZE, IMMUTABLE_CACHE_CONTROL, content_addressed_name, delete_blob_by_url, upload_imgFile_to_blob
+
+"""
+상품 이미지 변형(derivative)
+
+원본 업로드 시 목록/상세/확대용 WebP 이미지와 블러 placeholder를 만들어 원본 옆에 저장
+- 리사이즈/인코딩은 CPU 작업이므로 이벤트 루프가 아닌 프로세스 풀에서 실행
+- 업로드 파일은 메모리에 읽지 않고 임시 파일로 나눠 복사한 뒤 경로만 프로세스 풀에 넘김 (worker가 직접 열어서 읽음)
+- 원본보다 크게 늘리지 않음 (작은 원본이면 원본 크기의 WebP)
+- 결과는 상품 문서의 images 필드에 저장 {original, card, detail, zoom, placeholder}
+- blob 이름에 내용 해시가 붙으므로 덮어쓰지 않고, 이미지가 바뀌면 이전 blob을 삭제
+"""
+
+# 변형 이름 -> 최대 가로/세로 px
+IMAGE_VARIANTS = {
+    "card": 400,
+    "detail": 1000,
+    "zoom": 2000,
+}
+IMAGE_WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", 80))
+IMAGE_PLACEHOLDER_SIZE = 16
+IMAGE_PROCESS_WORKERS = int(os.getenv("IMAGE_PROCESS_WORKERS", 2))
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # 이벤트 루프/Motor 스레드가 있는 프로세스를 fork하지 않도록 forkserver(없으면 spawn)로 worker 생성
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _executor = ProcessPoolExecutor(max_workers=IMAGE_PROCESS_WORKERS, mp_context=multiprocessing.get_context(start_method))
+    return _executor
+
+
+def shutdown_image_pool():
+    """lifespan 종료 시 호출"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _encode_webp(image, max_size: int, quality: int) -> bytes:
+    from PIL import Image
+
+    resized = image.copy()
+    resized.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    resized.save(buffer, format="WEBP", quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def render_variants(source: bytes | str) -> tuple[dict, str]:
+    """
+    프로세스 풀에서 실행되는 변형 생성 함수
+
+    input : 원본 이미지 bytes 또는 파일 경로
+    output : ({변형 이름: WebP bytes}, placeholder data URI)
+    """
+    # Pillow는 변형 생성 시에만 import (API 시작 시간 단축)
+    from PIL import Image, ImageOps
+
+    with Image.open(source if isinstance(source, str) else io.BytesIO(source)) as source:
+        # EXIF 회전 정보 반영, 투명도가 있으면 유지
+        image = ImageOps.exif_transpose(source)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    variants = {
+        name: _encode_webp(image, max_size, IMAGE_WEBP_QUALITY)
+        for name, max_size in IMAGE_VARIANTS.items()
+    }
+    placeholder = _encode_webp(image, IMAGE_PLACEHOLDER_SIZE, 30)
+    return variants, "data:image/webp;base64," + base64.b64encode(placeholder).decode()
+
+
+async def create_image_variants(container_name: str, original_url: str, blob_name: str, source: bytes | str) -> dict:
+    """
+    변형 이미지를 생성해 {blob_name 확장자 제외}_{변형 이름}.{내용 해시}.webp로 업로드
+
+    input : source {원본 이미지 bytes 또는 파일 경로}
+    output : images{original, card, detail, zoom, placeholder}
+    """
+    variants, placeholder = await asyncio.get_running_loop().run_in_executor(_get_executor(), render_variants, source)
+
+    base_name, _ = os.path.splitext(blob_name)
+    names = list(variants)
+    urls = await asyncio.gather(*[
+        upload_imgFile_to_blob(
+            container_name,
+            variants[name],
+            content_addressed_name(f"{base_name}_{name}.webp", hashlib.sha256(variants[name]).hexdigest()),
+            cache_control=IMMUTABLE_CACHE_CONTROL,
+        )
+        for name in names
+    ])
+    if None in urls:
+        raise RuntimeError("이미지 변형 업로드에 실패했습니다.")
+
+    return {"original": original_url, **dict(zip(names, urls)), "placeholder": placeholder}
+
+
+async def create_image_variants_from_upload(container_name: str, original_url: str, blob_name: str, upload_file) -> dict:
+    """
+    UploadFile을 BLOB_UPLOAD_CHUNK_SIZE씩 임시 파일로 복사해 변형 이미지 생성 (요청당 메모리 사용량은 chunk 크기로 제한)
+
+    output : images{original, card, detail, zoom, placeholder}
+    """
+    await upload_file.seek(0)
+    with tempfile.NamedTemporaryFile(suffix=os.path.splitext(blob_name)[1]) as temp_file:
+        while chunk := await upload_file.read(BLOB_UPLOAD_CHUNK_SIZE):
+            await asyncio.to_thread(temp_file.write, chunk)
+        await asyncio.to_thread(temp_file.flush)
+        return await create_image_variants(container_name, original_url, blob_name, temp_file.name)
+
+
+async def delete_product_images(container_name: str, product_item: dict, keep: dict | None = None):
+    """
+    상품의 원본/변형 blob 삭제
+
+    keep에 있는 url(새 이미지)과 다른 상품이 함께 쓰는 blob(내용 해시가 같은 이미지)은 유지
+    """
+    images = product_item.get("images") or {}
+    keep_urls = set((keep or {}).values())
+    urls = [product_item.get("main_image_url"), *[images.get(name) for name in IMAGE_VARIANTS]]
+
+    for url in urls:
+        if not url or url in keep_urls:
+            continue
+        shared = await db["bonre_products"].find_one(
+            {
+                "_id": {"$ne": product_item["_id"]},
+                "$or": [{"main_image_url": url}, *[{f"images.{name}": url} for name in IMAGE_VARIANTS]],
+            },
+            {"_id": 1},
+        )
+        if not shared:
+            await delete_blob_by_url(container_name, url)
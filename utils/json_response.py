@@ -0,0 +1,40 @@
+import orjson
+from bson import ObjectId, Decimal128
+from pydantic import BaseModel
+from fastapi.responses import JSONResponse
+
+"""
+BSON 문서 JSON 인코딩
+
+Motor에서 받은 문서를 jsonable_encoder / sanitize_data 없이 orjson으로 한 번에 bytes로 변환
+- ObjectId, Decimal128 -> str
+- datetime -> ISO 8601 문자열 (orjson 기본 동작)
+- NaN, inf -> null (orjson 기본 동작)
+"""
+
+
+def _bson_default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", by_alias=True)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps_bson(content) -> bytes:
+    """BSON 문서(dict/list)를 JSON bytes로 변환"""
+    return orjson.dumps(content, default=_bson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class BSONJSONResponse(JSONResponse):
+    """
+    orjson 기반 응답 클래스 (app 기본 응답 클래스)
+
+    라우터에서 Mongo 문서를 그대로 BSONJSONResponse(items)로 반환하면 중간 dict 복사 없이 바로 인코딩됨
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps_bson(content)
@@ -0,0 +1,95 @@
+"""
+Product card
+
+목록 API(홈, 브랜드별 상품, 상세 페이지의 브랜드 상품, 북마크 상품)에서 공통으로 사용하는 상품 카드
+
+카드에 필요한 필드만 조회하도록 projection을 공유하고, cheapest는 마지막 항목만 가져옴
+(description, filter, shop_urls, 전체 가격 이력은 전송하지 않음)
+
+이미지는 원본 대신 카드용 변형(images.card)을 사용하고, 변형이 없는 상품은 원본 url 사용
+"""
+
+PRODUCT_CARD_FIELDS = [
+    "_id",
+    "name_kr",
+    "name",
+    "subname",
+    "subname_kr",
+    "brand",
+    "brand_kr",
+    "main_image_url",
+    "bookmark_counts",
+    "category",
+    "images.card",
+    "images.placeholder",
+]
+
+# 브랜드별 상품 목록 정렬 (brand, upload 조건과 함께 사용)
+BRAND_PRODUCTS_SORT = {"name": 1, "subname": 1}
+
+# find()용 projection
+PRODUCT_CARD_PROJECTION = {
+    **{field: 1 for field in PRODUCT_CARD_FIELDS},
+    "cheapest": {"$slice": -1},
+}
+
+# aggregate()용 $project 단계
+PRODUCT_CARD_PROJECT_STAGE = {
+    "$project": {
+        **{field: 1 for field in PRODUCT_CARD_FIELDS},
+        "cheapest": {"$slice": ["$cheapest", -1]},
+    }
+}
+
+
+def latest_cheapest_price(item: dict):
+    """가격 이력의 마지막 최저가. 이력이 없으면 None"""
+    cheapest = item.get("cheapest")
+    if cheapest:
+        return cheapest[-1].get("price")
+    return None
+
+
+def card_image_url(item: dict) -> str:
+    """카드용 이미지 url. 변형이 없으면 원본"""
+    return (item.get("images") or {}).get("card") or item.get("main_image_url", "")
+
+
+def build_product_card(item: dict) -> dict:
+    """
+    브랜드별 상품, 상세 페이지 브랜드 상품, 북마크 상품 목록용 카드
+
+    output : {_id, name_kr, name, subname, subname_kr, brand, main_image_url, image_placeholder, cheapest}
+    """
+    return {
+        "_id": str(item["_id"]),
+        "name_kr": item.get("name_kr", ""),
+        "name": item.get("name", ""),
+        "subname": item.get("subname", ""),
+        "subname_kr": item.get("subname_kr", ""),
+        "brand": item.get("brand", ""),
+        "main_image_url": card_image_url(item),
+        "image_placeholder": (item.get("images") or {}).get("placeholder"),
+        "cheapest": str(latest_cheapest_price(item)),
+    }
+
+
+def build_home_product_card(item: dict) -> dict:
+    """
+    홈 목록(/product/home)용 카드. brand는 한글 브랜드명, 북마크 수와 카테고리 포함
+
+    output : {_id, name_kr, name, subname, subname_kr, brand, main_image_url, image_placeholder, bookmark_counts, cheapest, categories}
+    """
+    return {
+        "_id": str(item["_id"]),
+        "name_kr": item.get("name_kr", ""),
+        "name": item.get("name", ""),
+        "subname": item.get("subname", ""),
+        "subname_kr": item.get("subname_kr", ""),
+        "brand": item.get("brand_kr", ""),
+        "main_image_url": card_image_url(item),
+        "image_placeholder": (item.get("images") or {}).get("placeholder"),
+        "bookmark_counts": item.get("bookmark_counts", 0),
+        "cheapest": latest_cheapest_price(item),
+        "categories": item.get("category", []),
+    }
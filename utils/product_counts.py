@@ -0,0 +1,177 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Hashable, Optional
+
+from pymongo import UpdateOne
+
+from db.database import db
+
+logger = logging.getLogger(__name__)
+
+# 캐시된 상품 개수의 유효 시간 (초). 만료되면 다음 요청에서 다시 계산
+COUNT_TTL_SECONDS = int(os.getenv("PRODUCT_COUNT_TTL_SECONDS", 300))
+# 검색어별 캐시가 무한히 늘어나지 않도록 최대 항목 수 제한
+COUNT_CACHE_MAX_ENTRIES = 1000
+
+# key -> (count, 계산 시각)
+_count_cache: dict[Hashable, tuple[int, float]] = {}
+
+
+async def get_cached_count(key: Hashable, loader: Callable[[], Awaitable[int]]) -> int:
+    """
+    목록 API의 전체 개수를 캐시에서 반환. 캐시가 없거나 만료된 경우 loader로 다시 계산
+
+    페이지마다 전체 개수를 세지 않기 위한 근사값이므로 최대 COUNT_TTL_SECONDS만큼 늦게 반영될 수 있음
+    """
+    now = time.monotonic()
+    cached = _count_cache.get(key)
+    if cached and now - cached[1] < COUNT_TTL_SECONDS:
+        return cached[0]
+
+    count = await loader()
+    if len(_count_cache) >= COUNT_CACHE_MAX_ENTRIES:
+        _count_cache.clear()
+    _count_cache[key] = (count, now)
+    return count
+
+
+def invalidate_counts():
+    """상품 개수 캐시 전체 삭제"""
+    _count_cache.clear()
+
+
+"""
+업로드 상품 개수 테이블 (bonre_product_counts)
+
+{_id: "__all__", count, rebuilt_at} : upload=True인 전체 상품 수, 마지막 전체 재집계 시각
+{_id: category_id, count} : upload=True인 카테고리별 상품 수
+
+상품 생성/수정/삭제 시 apply_product_count_change()로 갱신하고, 목록 API는 이 값을 조회만 함
+rebuilt_at은 rebuild_upload_counts()만 기록하므로, 테이블이 없을 때 $inc upsert로 생긴 __all__은 유효한 테이블로 보지 않음
+"""
+
+COUNTS_COLLECTION = "bonre_product_counts"
+ALL_PRODUCTS_KEY = "__all__"
+
+
+def _count_keys(product: Optional[dict]) -> set:
+    """상품이 개수 테이블에 기여하는 key 목록 (업로드되지 않은 상품은 없음)"""
+    if not product or not product.get("upload"):
+        return set()
+    return {ALL_PRODUCTS_KEY, *(product.get("category") or [])}
+
+
+async def apply_product_count_change(old: Optional[dict], new: Optional[dict]):
+    """
+    상품 변경 전후 상태를 비교해 개수 테이블 갱신
+
+    생성: old=None, 삭제: new=None, 수정: upload/category 변경분만 반영
+    """
+    old_keys = _count_keys(old)
+    new_keys = _count_keys(new)
+    operations = [
+        UpdateOne({"_id": key}, {"$inc": {"count": 1}}, upsert=True) for key in new_keys - old_keys
+    ] + [
+        UpdateOne({"_id": key}, {"$inc": {"count": -1}}, upsert=True) for key in old_keys - new_keys
+    ]
+    if operations:
+        await db[COUNTS_COLLECTION].bulk_write(operations, ordered=False)
+        invalidate_counts()
+
+
+# 개수 테이블이 없을 때 실행 중인 재생성 작업 (중복 실행 방지)
+_rebuild_task: Optional[asyncio.Task] = None
+
+
+def _schedule_rebuild():
+    global _rebuild_task
+    if _rebuild_task is None or _rebuild_task.done():
+        _rebuild_task = asyncio.create_task(_rebuild_in_background())
+
+
+async def _rebuild_in_background():
+    try:
+        await rebuild_upload_counts()
+        logger.info("Product counts table rebuilt")
+    except Exception as e:
+        logger.error(f"Failed to rebuild product counts: {e}", exc_info=True)
+
+
+async def get_upload_count(category_id: Optional[str] = None) -> int:
+    """
+    개수 테이블에서 업로드된 상품 수 조회
+
+    테이블이 없으면(재집계된 __all__ 문서 없음) count_documents 결과를 캐시해 반환하고 백그라운드에서 테이블 재생성
+    __all__이 있는데 카테고리 문서가 없으면 해당 카테고리 상품이 없는 것이므로 0
+    """
+    key = category_id or ALL_PRODUCTS_KEY
+    items = {item["_id"]: item async for item in db[COUNTS_COLLECTION].find({"_id": {"$in": [key, ALL_PRODUCTS_KEY]}})}
+    if "rebuilt_at" in items.get(ALL_PRODUCTS_KEY, {}):
+        return max(items[key]["count"], 0) if key in items else 0
+
+    logger.warning("Product counts table is missing, counting products directly")
+    _schedule_rebuild()
+
+    async def load_count():
+        match = {"upload": True}
+        if category_id:
+            match["category"] = category_id
+        return await db["bonre_products"].count_documents(match)
+
+    return await get_cached_count(("upload_count", category_id), load_count)
+
+
+async def recount_upload_counts() -> dict:
+    """bonre_products 전체를 다시 세어 {key: count} 반환"""
+    counts = {ALL_PRODUCTS_KEY: await db["bonre_products"].count_documents({"upload": True})}
+    pipeline = [
+        {"$match": {"upload": True}},
+        # 한 상품에 같은 카테고리가 중복되어 있어도 한 번만 집계
+        {"$project": {"category": {"$setUnion": [{"$ifNull": ["$category", []]}, []]}}},
+        {"$unwind": "$category"},
+        {"$group": {"_id": "$category", "count": {"$sum": 1}}},
+    ]
+    async for item in db["bonre_products"].aggregate(pipeline):
+        counts[item["_id"]] = item["count"]
+    return counts
+
+
+async def verify_upload_counts() -> dict:
+    """개수 테이블과 전체 재집계 결과를 비교해 불일치 항목 반환"""
+    expected = await recount_upload_counts()
+    stored = {item["_id"]: item["count"] async for item in db[COUNTS_COLLECTION].find()}
+    mismatches = {
+        key: {"stored": stored.get(key, 0), "recounted": expected.get(key, 0)}
+        for key in set(expected) | set(stored)
+        if stored.get(key, 0) != expected.get(key, 0)
+    }
+    return {"consistent": not mismatches, "mismatches": mismatches, "counts": expected}
+
+
+async def rebuild_upload_counts() -> dict:
+    """전체 재집계 결과로 개수 테이블을 덮어씀"""
+    counts = await recount_upload_counts()
+    await db[COUNTS_COLLECTION].delete_many({"_id": {"$nin": list(counts)}})
+    category_counts = {key: count for key, count in counts.items() if key != ALL_PRODUCTS_KEY}
+    if category_counts:
+        await db[COUNTS_COLLECTION].bulk_write(
+            [UpdateOne({"_id": key}, {"$set": {"count": count}}, upsert=True) for key, count in category_counts.items()],
+            ordered=False,
+        )
+    # 카테고리 문서를 모두 쓴 뒤 rebuilt_at 기록 (중간에 실패하면 테이블이 없는 것으로 처리됨)
+    await db[COUNTS_COLLECTION].update_one(
+        {"_id": ALL_PRODUCTS_KEY},
+        {"$set": {"count": counts[ALL_PRODUCTS_KEY], "rebuilt_at": datetime.utcnow()}},
+        upsert=True,
+    )
+    invalidate_counts()
+    return counts
+
+
+async def ensure_upload_counts():
+    """개수 테이블이 아직 없으면 (최초 배포, 재집계 전 $inc로 생긴 __all__만 있는 경우 포함) 전체 재집계로 생성. lifespan 시작 시 호출됨"""
+    if not await db[COUNTS_COLLECTION].find_one({"_id": ALL_PRODUCTS_KEY, "rebuilt_at": {"$exists": True}}):
+        await rebuild_upload_counts()
@@ -1,115 +1,178 @@
+import base64
+import json
 from typing import Optional, List
 from math import ceil
-from db.database import db
-from db.models import sanitize_data
+from bson import ObjectId
+from db.database import catalog_db
+from utils.product_counts import get_cached_count, get_upload_count
+from utils.product_card import PRODUCT_CARD_PROJECT_STAGE, build_home_product_card
+from utils.bookmark_status import get_bookmarked_product_ids
 import logging
 from fastapi import HTTPException
 
 logger = logging.getLogger(__name__)
 
-async def search_products(
+# 홈 목록 정렬 키. 마지막 _id로 동일한 값 사이의 순서를 고정 (keyset pagination)
+HOME_SORT = {"brand": 1, "name": 1, "subname": 1, "_id": 1}
+
+
+def encode_cursor(item: dict) -> str:
+    """
+    마지막 항목의 정렬 키를 cursor 토큰으로 변환
+    """
+    key = [item.get("brand"), item.get("name"), item.get("subname"), str(item["_id"])]
+    return base64.urlsafe_b64encode(json.dumps(key, ensure_ascii=False).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """
+    cursor 토큰을 정렬 키 [brand, name, subname, _id]로 변환. 잘못된 토큰이면 400
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        brand, name, subname, item_id = json.loads(base64.urlsafe_b64decode(padded))
+        return [brand, name, subname, ObjectId(item_id)]
+    except Exception:
+        raise HTTPException(status_code=400, detail="유효하지 않은 cursor입니다.")
+
+
+def _after(value):
+    # null은 모든 문자열보다 앞에 정렬되므로, null 다음은 null이 아닌 모든 값
+    return {"$gt": value} if value is not None else {"$ne": None}
+
+
+def build_cursor_match(cursor: str) -> dict:
+    """
+    cursor 이후의 항목만 조회하는 조건 (brand, name, subname, _id) > cursor
+    """
+    brand, name, subname, item_id = decode_cursor(cursor)
+    return {
+        "$or": [
+            {"brand": _after(brand)},
+            {"brand": brand, "name": _after(name)},
+            {"brand": brand, "name": name, "subname": _after(subname)},
+            {"brand": brand, "name": name, "subname": subname, "_id": {"$gt": item_id}},
+        ]
+    }
+
+
+def build_search_stage(query: str) -> dict:
+    """
+    Atlas Search autocomplete 단계
+    """
+    return {
+        "$search": {
+            "index": "product_index",
+            "compound": {
+                "should": [
+                    {
+                        "autocomplete": {
+                            "query": query,
+                            "path": path,
+                            "fuzzy": {"maxEdits": 1}
+                        }
+                    }
+                    for path in ["name", "name_kr", "brand", "brand_kr", "subname", "subname_kr"]
+                ]
+            }
+        }
+    }
+
+
+def build_home_pipeline(
     page: int = 1,
     limit: int = 20,
     category_id: Optional[str] = None,
-    query: Optional[str] = None
-):
-    skip = (page - 1) * limit
+    query: Optional[str] = None,
+    cursor: Optional[str] = None
+) -> list:
+    """
+    홈 화면 상품 목록 aggregate pipeline (db.indexes의 실행 계획 검증에서도 사용)
+    """
     pipeline = []
 
     # Atlas Search 적용
     if query:
-        pipeline.append({
-            "$search": {
-                "index": "product_index",
-                "compound": {
-                    "should": [
-                        {
-                            "autocomplete": {
-                                "query": query,
-                                "path": "name",
-                                "fuzzy": {"maxEdits": 1}
-                            }
-                        },
-                        {
-                            "autocomplete": {
-                                "query": query,
-                                "path": "name_kr",
-                                "fuzzy": {"maxEdits": 1}
-                            }
-                        },
-                        {
-                            "autocomplete": {
-                                "query": query,
-                                "path": "brand",
-                                "fuzzy": {"maxEdits": 1}
-                            }
-                        },
-                        {
-                            "autocomplete": {
-                                "query": query,
-                                "path": "brand_kr",
-                                "fuzzy": {"maxEdits": 1}
-                            }
-                        },
-                        {
-                            "autocomplete": {
-                                "query": query,
-                                "path": "subname",
-                                "fuzzy": {"maxEdits": 1}
-                            }
-                        },
-                        {
-                            "autocomplete": {
-                                "query": query,
-                                "path": "subname_kr",
-                                "fuzzy": {"maxEdits": 1}
-                            }
-                        }
-                    ]
-                }
-            }
-        })
+        pipeline.append(build_search_stage(query))
 
     # 업로드된 상품만 필터링
     match_stage = { "upload": True }
     if category_id:
         match_stage["category"] = category_id
+    if cursor:
+        match_stage.update(build_cursor_match(cursor))
     pipeline.append({ "$match": match_stage })
 
     # 정렬 및 페이징
-    pipeline.append({
-        "$facet": {
-            "documents": [
-                { "$sort": { "brand": 1, "name": 1, "subname": 1 } },
-                { "$skip": skip },
-                { "$limit": limit }
-            ],
-            "total": [
-                { "$count": "count" }
-            ]
-        }
-    })
-
-    result = await db["bonre_products"].aggregate(pipeline).to_list(length=1)
-    items = result[0]["documents"]
-    total_count = result[0]["total"][0]["count"] if result[0]["total"] else 0
-
-    sanitized_items = sanitize_data(items)
-    filtered_items = [
-        {
-            "_id": str(item["_id"]),
-            "name_kr": item.get("name_kr", ""),
-            "name": item.get("name", ""),
-            "subname": item.get("subname", ""),
-            "subname_kr": item.get("subname_kr", ""),
-            "brand": item.get("brand_kr", ""),
-            "main_image_url": item.get("main_image_url", ""),
-            "bookmark_counts": item.get("bookmark_counts", 0),
-            "cheapest": item.get("cheapest", [{}])[-1].get("price") if item.get("cheapest") else None,
-            "categories": item.get("category", [])
-        }
-        for item in sanitized_items
-    ]
+    pipeline.append({ "$sort": HOME_SORT })
+    if not cursor:
+        pipeline.append({ "$skip": (page - 1) * limit })
+    pipeline.append({ "$limit": limit })
+    # 카드에 필요한 필드만 전송
+    pipeline.append(PRODUCT_CARD_PROJECT_STAGE)
+    return pipeline
+
+
+def build_duplicate_check_query(product_name: str, product_sub_name: Optional[str] = None) -> dict:
+    """
+    상품 중복 검사 조건 (제품명, 서브네임이 주어진 경우에만 서브네임 포함)
+    """
+    query = {
+        "name_kr": product_name,
+        "upload": True
+    }
+    if product_sub_name:
+        query["subname_kr"] = product_sub_name
+    return query
+
+
+async def count_products(category_id: Optional[str] = None, query: Optional[str] = None) -> int:
+    """
+    업로드된 상품 수
+
+    검색어가 없으면 상품 변경 시 갱신되는 개수 테이블에서 조회, 검색어가 있으면 캐시된 값(주기적으로 갱신) 사용
+    """
+    if not query:
+        return await get_upload_count(category_id)
+
+    match_stage = {"upload": True}
+    if category_id:
+        match_stage["category"] = category_id
+
+    async def load_count():
+        pipeline = [build_search_stage(query), {"$match": match_stage}, {"$count": "count"}]
+        result = await catalog_db["bonre_products"].aggregate(pipeline).to_list(length=1)
+        return result[0]["count"] if result else 0
+
+    return await get_cached_count((category_id, query), load_count)
+
+
+async def search_products(
+    page: int = 1,
+    limit: int = 20,
+    category_id: Optional[str] = None,
+    query: Optional[str] = None,
+    cursor: Optional[str] = None,
+    user_email: Optional[str] = None
+):
+    """
+    홈 화면 상품 목록
+
+    cursor가 주어지면 keyset pagination으로 cursor 이후 limit개를 조회 (페이지 깊이와 무관하게 일정한 비용)
+    cursor가 없으면 기존 page/limit 방식(skip)으로 조회. 두 방식 모두 next_cursor를 반환
+    user_email이 주어지면 각 항목에 is_bookmarked 표시 (비로그인은 모두 False)
+    """
+    pipeline = build_home_pipeline(page, limit, category_id, query, cursor)
+    items = await catalog_db["bonre_products"].aggregate(pipeline).to_list(length=limit)
+    total_count = await count_products(category_id, query)
+    next_cursor = encode_cursor(items[-1]) if len(items) == limit else None
+
+    filtered_items = [build_home_product_card(item) for item in items]
+
+    # 북마크 여부 표시 (페이지 항목에 대해 한 번만 조회)
+    bookmarked_ids = await get_bookmarked_product_ids(user_email, [item["_id"] for item in filtered_items]) if user_email else set()
+    for item in filtered_items:
+        item["is_bookmarked"] = item["_id"] in bookmarked_ids
 
     return {
         "items": filtered_items,
@@ -117,7 +180,8 @@ async def search_products(
         "selected-item-number": len(filtered_items),
         "page": page,
         "limit": limit,
-        "total_pages": ceil(total_count / limit)
+        "total_pages": ceil(total_count / limit),
+        "next_cursor": next_cursor
     }
 
 async def get_search_suggestions_db(query: str) -> List[str]:
@@ -265,7 +329,7 @@ async def get_search_suggestions_db(query: str) -> List[str]:
             ]
         
         # 검색 실행
-        result = await db["bonre_products"].aggregate(pipeline).to_list(length=10)
+        result = await catalog_db["bonre_products"].aggregate(pipeline).to_list(length=10)
         
         # 중복 제거 및 제안 생성
         suggestions = list({